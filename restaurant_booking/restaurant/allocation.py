@@ -0,0 +1,27 @@
+from .availability import DaySchedule
+from .models import Booking, Table
+
+
+def best_fit(tables, schedule, party_size, start_time, duration=None):
+    # `tables` must be ordered by capacity so the first free table that
+    # seats the party is also the smallest one.
+    for table in tables:
+        if table.capacity >= party_size and schedule.is_free(table.pk, start_time, duration):
+            return table
+    return None
+
+
+def candidate_tables(party_size=None):
+    tables = Table.objects.order_by('capacity', 'number')
+    if party_size is not None:
+        tables = tables.filter(capacity__gte=party_size)
+    return tables
+
+
+def find_table(party_size, date, start_time, duration=None, exclude=None):
+    if duration is None:
+        duration = Booking.DEFAULT_DURATION
+
+    tables = candidate_tables(party_size)
+    schedule = DaySchedule.for_date(date, tables=tables, exclude=exclude)
+    return best_fit(tables, schedule, party_size, start_time, duration)
@@ -0,0 +1,289 @@
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from heapq import merge
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Max, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+
+from .models import Booking, BookingArchive, CustomUser, DailyBookingStats
+
+
+def date_range(start_date, end_date):
+    dates = []
+    current_date = start_date
+    while current_date <= end_date:
+        dates.append(current_date)
+        current_date += timedelta(days=1)
+    return dates
+
+
+def daily_counts(queryset, date_expression, start_date, end_date, count=None):
+    # One GROUP BY over the whole window; days without rows are zero-filled
+    # here instead of costing a query each.
+    if count is None:
+        count = Count('pk')
+
+    rows = (
+        queryset.annotate(day=date_expression)
+        .filter(day__gte=start_date, day__lte=end_date)
+        .order_by()
+        .values('day')
+        .annotate(count=count)
+    )
+    counts = {row['day']: row['count'] for row in rows}
+
+    return [(date, counts.get(date, 0)) for date in date_range(start_date, end_date)]
+
+
+def booking_stats(start_date=None, end_date=None, table=None):
+    stats = DailyBookingStats.objects.all()
+    if start_date is not None:
+        stats = stats.filter(date__gte=start_date)
+    if end_date is not None:
+        stats = stats.filter(date__lte=end_date)
+    if table is not None:
+        stats = stats.filter(table=table)
+    return stats
+
+
+def daily_booking_counts(start_date, end_date, table=None):
+    return daily_counts(
+        booking_stats(table=table), F('date'), start_date, end_date, count=Sum('booking_count')
+    )
+
+
+def daily_signup_counts(start_date, end_date, users=None):
+    if users is None:
+        users = CustomUser.objects.all()
+    return daily_counts(users, TruncDate('date_joined'), start_date, end_date)
+
+
+def booking_summary(start_date=None, end_date=None, table=None):
+    totals = booking_stats(start_date, end_date, table).aggregate(
+        total_bookings=Sum('booking_count'),
+        total_guests=Sum('guest_count'),
+        **{
+            status: Sum('booking_count', filter=Q(status=status))
+            for status, label in Booking.STATUS_CHOICES
+        }
+    )
+    return {
+        'total_bookings': totals['total_bookings'] or 0,
+        'total_guests': totals['total_guests'] or 0,
+        'status_counts': {status: totals[status] or 0 for status, label in Booking.STATUS_CHOICES},
+    }
+
+
+def hourly_booking_counts(start_date=None, end_date=None, table=None):
+    rows = (
+        booking_stats(start_date, end_date, table)
+        .order_by()
+        .values('hour')
+        .annotate(count=Sum('booking_count'))
+    )
+    return {row['hour']: row['count'] for row in rows if row['count']}
+
+
+def booking_figures(bookings, today):
+    past = Q(date__lt=today)
+    visited = past & ~Q(status='CANCELLED')
+    return bookings.order_by().values('user').annotate(
+        bookings_count=Count('pk'),
+        upcoming_bookings=Count('pk', filter=Q(date__gte=today)),
+        completed_bookings=Count('pk', filter=past),
+        **{
+            f'{status.lower()}_bookings': Count('pk', filter=Q(status=status))
+            for status, label in Booking.STATUS_CHOICES
+        },
+        visits=Count('pk', filter=visited),
+        last_visit=Max('date', filter=visited),
+        total_guests=Sum('number_of_guests'),
+    )
+
+
+def customer_stats(user_id, today):
+    # A customer's booking figures over both the live and the archived
+    # table: the same conditional aggregate on each, in one UNION ALL
+    # query, added together here. Computed on read rather than stored,
+    # since upcoming, completed and visits change with the date.
+    stats = {
+        'bookings_count': 0, 'upcoming_bookings': 0, 'completed_bookings': 0, 'visits': 0,
+        'last_visit': None, 'total_guests': 0,
+        **{f'{status.lower()}_bookings': 0 for status, label in Booking.STATUS_CHOICES},
+    }
+    live = booking_figures(Booking.objects.filter(user_id=user_id), today)
+    archived = booking_figures(BookingArchive.objects.filter(user_id=user_id), today)
+    for row in live.union(archived, all=True):
+        for key, value in row.items():
+            if key == 'last_visit':
+                stats[key] = max(filter(None, (stats[key], value)), default=None)
+            elif key != 'user':
+                stats[key] += value
+    stats['avg_party_size'] = stats['total_guests'] / stats['bookings_count'] if stats['bookings_count'] else 0
+    return stats
+
+
+def favorite_table(user_id):
+    # Number of the table the customer has booked most, live and archived.
+    counts = Counter()
+    live, archived = (
+        model.objects.filter(user_id=user_id).order_by().values('table__number').annotate(count=Count('pk')).values_list('table__number', 'count')
+        for model in (Booking, BookingArchive)
+    )
+    for number, count in live.union(archived, all=True):
+        counts[number] += count
+    return min(counts, key=lambda number: (-counts[number], number), default=None)
+
+
+def archived_bookings_count():
+    # Annotation for CustomUser querysets, to add to Count('booking').
+    archived = BookingArchive.objects.filter(user=OuterRef('pk')).order_by().values('user').annotate(count=Count('pk'))
+    return Coalesce(Subquery(archived.values('count')), 0)
+
+
+# Rollup maintenance
+
+STATS_FIELDS = ('date', 'table_id', 'status', 'time', 'number_of_guests')
+STATS_KEY_FIELDS = ('date', 'table_id', 'status', 'hour')
+
+# Rollup changes held back by batched_booking_stats().
+pending_changes = ContextVar('pending_booking_changes', default=None)
+
+def booking_state(booking):
+    return {field: getattr(booking, field) for field in STATS_FIELDS}
+
+
+def booking_stats_key(booking):
+    return {
+        'date': Booking._meta.get_field('date').to_python(booking['date']),
+        'table_id': booking['table_id'],
+        'status': booking['status'],
+        'hour': Booking._meta.get_field('time').to_python(booking['time']).hour,
+    }
+
+
+def record_booking(booking, sign=1):
+    # `booking` is a dict of date, table_id, status, time and
+    # number_of_guests; sign is +1 when it starts counting and -1 when it
+    # stops. Decrements never create rows, so a row removed by a cascade
+    # is not recreated.
+    pending = pending_changes.get()
+    if pending is not None:
+        pending.append((booking, sign))
+        return
+    key = booking_stats_key(booking)
+    changes = {
+        'booking_count': F('booking_count') + sign,
+        'guest_count': F('guest_count') + sign * booking['number_of_guests'],
+    }
+    with transaction.atomic():
+        if sign > 0:
+            DailyBookingStats.objects.get_or_create(**key)
+        DailyBookingStats.objects.filter(**key).update(**changes)
+
+
+def record_bookings(changes):
+    # record_booking for many (booking, sign) pairs at once: the changes
+    # are summed per rollup row, missing rows are created with one INSERT
+    # and every count moves in one UPDATE.
+    deltas = defaultdict(lambda: [0, 0])
+    for booking, sign in changes:
+        delta = deltas[tuple(booking_stats_key(booking).values())]
+        delta[0] += sign
+        delta[1] += sign * booking['number_of_guests']
+    deltas = {key: delta for key, delta in deltas.items() if delta != [0, 0]}
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        DailyBookingStats.objects.bulk_create(
+            [DailyBookingStats(**dict(zip(STATS_KEY_FIELDS, key))) for key, (count, guests) in deltas.items() if count > 0],
+            ignore_conflicts=True,
+        )
+        rows = DailyBookingStats.objects.filter(
+            date__in={key[0] for key in deltas},
+            table_id__in={key[1] for key in deltas},
+        ).values_list('pk', *STATS_KEY_FIELDS)
+        ids = {row[0]: deltas[row[1:]] for row in rows if row[1:] in deltas}
+        if not ids:
+            return
+        DailyBookingStats.objects.filter(pk__in=ids).update(
+            booking_count=F('booking_count') + Case(*[When(pk=pk, then=Value(count)) for pk, (count, guests) in ids.items()]),
+            guest_count=F('guest_count') + Case(*[When(pk=pk, then=Value(guests)) for pk, (count, guests) in ids.items()]),
+        )
+
+
+@contextmanager
+def batched_booking_stats():
+    # Inside the block record_booking only collects its changes; they are
+    # applied together by record_bookings when the block exits cleanly.
+    changes = []
+    token = pending_changes.set(changes)
+    try:
+        yield
+    finally:
+        pending_changes.reset(token)
+    record_bookings(changes)
+
+
+@contextmanager
+def unrecorded_booking_changes():
+    # record_booking does nothing inside the block, for bookings that move
+    # between Booking and BookingArchive and so never stop being counted.
+    token = pending_changes.set([])
+    try:
+        yield
+    finally:
+        pending_changes.reset(token)
+
+
+def rebuild_booking_stats(batch_size=1000, start_date=None, end_date=None):
+    # Counts come from both Booking and BookingArchive. Each table is
+    # grouped in the rollup's key order and the two streams are merged,
+    # so a key present in both (a day archived only in part) is summed
+    # without holding the rollup in memory.
+    bookings = [Booking.objects.all(), BookingArchive.objects.all()]
+    stats = DailyBookingStats.objects.all()
+    if start_date is not None:
+        bookings = [queryset.filter(date__gte=start_date) for queryset in bookings]
+        stats = stats.filter(date__gte=start_date)
+    if end_date is not None:
+        bookings = [queryset.filter(date__lte=end_date) for queryset in bookings]
+        stats = stats.filter(date__lte=end_date)
+
+    key = itemgetter(*STATS_KEY_FIELDS)
+    with transaction.atomic():
+        stats.delete()
+        rows = merge(
+            *(
+                queryset.annotate(hour=ExtractHour('time'))
+                .order_by()
+                .values(*STATS_KEY_FIELDS)
+                .annotate(booking_count=Count('pk'), guest_count=Sum('number_of_guests'))
+                .order_by(*STATS_KEY_FIELDS)
+                .iterator(chunk_size=batch_size)
+                for queryset in bookings
+            ),
+            key=key,
+        )
+        batch = []
+        created = 0
+        for values, group in groupby(rows, key=key):
+            group = list(group)
+            batch.append(DailyBookingStats(
+                **dict(zip(STATS_KEY_FIELDS, values)),
+                booking_count=sum(row['booking_count'] for row in group),
+                guest_count=sum(row['guest_count'] for row in group),
+            ))
+            if len(batch) >= batch_size:
+                DailyBookingStats.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        DailyBookingStats.objects.bulk_create(batch)
+        created += len(batch)
+    return created
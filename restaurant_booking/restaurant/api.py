@@ -0,0 +1,156 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.forms import ValidationError
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+from django.views.decorators.http import require_GET, require_POST
+
+from .allocation import candidate_tables
+from .availability import AvailabilityGrid, DaySchedule, format_minutes
+from .forms import BookingForm
+from .models import Booking
+from .services import save_booking
+
+
+def booking_json(booking):
+    return {
+        'id': booking.id,
+        'table': booking.table.number,
+        'date': booking.date.isoformat(),
+        'time': booking.time.strftime('%H:%M'),
+        'duration': booking.duration,
+        'number_of_guests': booking.number_of_guests,
+        'status': booking.status,
+    }
+
+
+def error_response(errors, status=400):
+    return JsonResponse({'errors': errors}, status=status)
+
+
+async def authenticated_user(request):
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+# Availability polls only read, so they stay on the async ORM end to end
+# and never tie up a worker thread while waiting on the database.
+def parse_query(request):
+    errors = {}
+    try:
+        date = parse_date(request.GET.get('date', ''))
+    except ValueError:
+        date = None
+    if date is None:
+        errors['date'] = ["Enter a valid date (YYYY-MM-DD)."]
+
+    start_time = None
+    if request.GET.get('time'):
+        try:
+            start_time = parse_time(request.GET['time'])
+        except ValueError:
+            pass
+        if start_time is None:
+            errors['time'] = ["Enter a valid time (HH:MM)."]
+
+    guests = None
+    if request.GET.get('guests'):
+        try:
+            guests = int(request.GET['guests'])
+        except ValueError:
+            errors['guests'] = ["Enter a whole number."]
+    return date, start_time, guests, errors
+
+
+@require_GET
+async def availability(request):
+    date, start_time, guests, errors = parse_query(request)
+    if errors:
+        return error_response(errors)
+
+    tables = [table async for table in candidate_tables(guests)]
+    schedule = await DaySchedule.afor_date(date, tables=tables)
+
+    results = []
+    for table in tables:
+        booked = [
+            [format_minutes(start), format_minutes(end)]
+            for start, end in schedule.schedule(table.pk).intervals
+        ]
+        entry = {'id': table.id, 'number': table.number, 'capacity': table.capacity, 'booked': booked}
+        if start_time is not None:
+            entry['free'] = schedule.is_free(table.pk, start_time)
+        results.append(entry)
+
+    data = {'date': date.isoformat(), 'tables': results}
+    if start_time is not None:
+        data['time'] = start_time.strftime('%H:%M')
+        data['free_tables'] = sum(1 for entry in results if entry['free'])
+    return JsonResponse(data)
+
+
+# The whole day's slot grid in one response, so the booking widget can
+# show every bookable start time instead of probing them one by one.
+@require_GET
+async def availability_grid(request):
+    date, start_time, guests, errors = parse_query(request)
+    if errors:
+        return error_response(errors)
+
+    grid = await AvailabilityGrid.afor_date(date, candidate_tables(guests))
+    return JsonResponse(grid.as_json())
+
+
+def create_booking_sync(user, data):
+    form = BookingForm(data, auto_assign=True)
+    if not form.is_valid():
+        return None, form.errors
+    booking = form.save(commit=False)
+    booking.user = user
+    try:
+        save_booking(booking, auto_assign=True)
+    except ValidationError as e:
+        return None, e.message_dict
+    return booking, None
+
+
+# Creating a booking takes a row lock inside a transaction, which the async
+# ORM cannot do, so the write runs in one thread hop through save_booking.
+@require_POST
+async def booking_create(request):
+    user = await authenticated_user(request)
+    if user is None:
+        return error_response({'__all__': ["Authentication required."]}, status=401)
+
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return error_response({'__all__': ["Request body must be JSON."]})
+    if not isinstance(data, dict):
+        return error_response({'__all__': ["Request body must be a JSON object."]})
+
+    booking, errors = await sync_to_async(create_booking_sync)(user, data)
+    if errors:
+        return error_response(errors)
+    return JsonResponse(booking_json(booking), status=201)
+
+
+@require_POST
+async def booking_cancel(request, booking_id):
+    user = await authenticated_user(request)
+    if user is None:
+        return error_response({'__all__': ["Authentication required."]}, status=401)
+
+    try:
+        booking = await Booking.objects.select_related('table').aget(id=booking_id, user=user)
+    except Booking.DoesNotExist:
+        return error_response({'__all__': ["Booking not found."]}, status=404)
+
+    if booking.date < timezone.now().date():
+        return error_response({'__all__': ["Cannot cancel past bookings."]})
+
+    booking.status = 'CANCELLED'
+    await booking.asave()
+    return JsonResponse(booking_json(booking))
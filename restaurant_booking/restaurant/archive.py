@@ -0,0 +1,45 @@
+from heapq import merge
+from itertools import islice
+from operator import attrgetter
+
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import unrecorded_booking_changes
+from .models import Booking, BookingArchive
+
+ARCHIVED_FIELDS = [field.attname for field in BookingArchive._meta.concrete_fields if field.name != 'archived_at']
+
+
+def archive_bookings(before, batch_size=1000):
+    # Moves bookings dated before `before` to BookingArchive, oldest
+    # first, one transaction per batch: the live table is never locked
+    # for long and an interrupted run resumes where it stopped. Bookings
+    # another transaction holds are left for the next run. Yields the
+    # number moved in each batch.
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Booking.objects.filter(date__lt=before)
+                .order_by('date', 'time', 'id')
+                .select_for_update(skip_locked=True)
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return
+            archived_at = timezone.now()
+            BookingArchive.objects.bulk_create([BookingArchive(**row, archived_at=archived_at) for row in rows])
+            # The rollup counts archived bookings too.
+            with unrecorded_booking_changes():
+                Booking.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+        yield len(rows)
+
+
+def recent_customer_bookings(user_id, limit=10):
+    # A customer's latest `limit` bookings across the live and archived
+    # tables, newest first: the newest `limit` of each, merged.
+    querysets = [
+        model.objects.filter(user_id=user_id).select_related('table').order_by('-date', '-time', '-id')[:limit]
+        for model in (Booking, BookingArchive)
+    ]
+    return list(islice(merge(*querysets, key=attrgetter('date', 'time', 'id'), reverse=True), limit))
@@ -0,0 +1,204 @@
+from bisect import bisect_left, insort
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.dateparse import parse_time
+
+from .models import Booking
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def booking_interval(start_time, duration):
+    start = to_minutes(start_time)
+    return start, start + duration
+
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class TableSchedule:
+    # Bookings of one table on one day, kept as a sorted list of start
+    # minutes with a running maximum of end minutes. A bisect on the
+    # starts finds every interval beginning before the requested end, and
+    # the running maximum tells whether any of them is still seated at
+    # the requested start, so a lookup is O(log n) even if legacy data
+    # holds overlapping bookings.
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals)
+        self._reindex()
+
+    def _reindex(self):
+        self.starts = [start for start, end in self.intervals]
+        self.max_ends = []
+        latest_end = None
+        for start, end in self.intervals:
+            latest_end = end if latest_end is None else max(latest_end, end)
+            self.max_ends.append(latest_end)
+
+    def is_free(self, start, end):
+        i = bisect_left(self.starts, end)
+        return i == 0 or self.max_ends[i - 1] <= start
+
+    def add(self, start, end):
+        insort(self.intervals, (start, end))
+        self._reindex()
+
+    def __len__(self):
+        return len(self.intervals)
+
+
+class DaySchedule:
+    # Every table's TableSchedule for one date, built from a single query
+    # over that day's active bookings.
+
+    def __init__(self, date, intervals_by_table):
+        self.date = date
+        self.tables = {
+            table_id: TableSchedule(intervals)
+            for table_id, intervals in intervals_by_table.items()
+        }
+
+    @staticmethod
+    def active_bookings(date, tables=None, exclude=None):
+        bookings = Booking.objects.filter(date=date, status__in=Booking.ACTIVE_STATUSES)
+        if tables is not None:
+            bookings = bookings.filter(table__in=tables)
+        if exclude is not None:
+            bookings = bookings.exclude(pk=exclude)
+        return bookings.values_list('table_id', 'time', 'duration')
+
+    @classmethod
+    def from_rows(cls, date, rows):
+        intervals_by_table = defaultdict(list)
+        for table_id, start_time, duration in rows:
+            intervals_by_table[table_id].append(booking_interval(start_time, duration))
+        return cls(date, intervals_by_table)
+
+    @classmethod
+    def for_date(cls, date, tables=None, exclude=None):
+        return cls.from_rows(date, cls.active_bookings(date, tables, exclude))
+
+    @classmethod
+    async def afor_date(cls, date, tables=None, exclude=None):
+        rows = [row async for row in cls.active_bookings(date, tables, exclude)]
+        return cls.from_rows(date, rows)
+
+    @classmethod
+    def for_dates(cls, dates, tables=None):
+        # A DaySchedule for each of `dates`, from one query over all of them.
+        bookings = Booking.objects.filter(date__in=dates, status__in=Booking.ACTIVE_STATUSES)
+        if tables is not None:
+            bookings = bookings.filter(table__in=tables)
+        rows_by_date = defaultdict(list)
+        for date, *row in bookings.values_list('date', 'table_id', 'time', 'duration'):
+            rows_by_date[date].append(row)
+        return {date: cls.from_rows(date, rows_by_date[date]) for date in dates}
+
+    def schedule(self, table_id):
+        if table_id not in self.tables:
+            self.tables[table_id] = TableSchedule()
+        return self.tables[table_id]
+
+    def is_free(self, table_id, start_time, duration=None):
+        if duration is None:
+            duration = Booking.DEFAULT_DURATION
+        return self.schedule(table_id).is_free(*booking_interval(start_time, duration))
+
+    def reserve(self, table_id, start_time, duration=None):
+        if duration is None:
+            duration = Booking.DEFAULT_DURATION
+        self.schedule(table_id).add(*booking_interval(start_time, duration))
+
+
+def table_is_free(table, date, start_time, duration=None, exclude=None):
+    schedule = DaySchedule.for_date(date, tables=[table], exclude=exclude)
+    return schedule.is_free(table.pk, start_time, duration)
+
+
+FREE_SLOT_CHARS = bytes.maketrans(b'\x00\x01', b'01')
+
+
+class AvailabilityGrid:
+    # Bookable start times for every table on one day. Each table gets a
+    # bytearray with one byte per slot between opening and closing, set to
+    # 1 when a seating of `duration` minutes starting there overlaps no
+    # active booking. Each booking clears one contiguous run of slots, so
+    # building the grid costs a slice assignment per booking.
+
+    def __init__(self, date, tables, schedule, duration=None, opening=None, closing=None, slot_minutes=None):
+        self.date = date
+        self.tables = list(tables)
+        self.duration = duration or Booking.DEFAULT_DURATION
+        self.opening = to_minutes(opening or parse_time(settings.BOOKING_OPENING_TIME))
+        self.closing = to_minutes(closing or parse_time(settings.BOOKING_CLOSING_TIME))
+        self.slot_minutes = slot_minutes or settings.BOOKING_SLOT_MINUTES
+        self.slots = list(range(self.opening, self.closing, self.slot_minutes))
+        self.rows = {table.pk: self.build_row(schedule.schedule(table.pk)) for table in self.tables}
+
+    @classmethod
+    def for_date(cls, date, tables, **kwargs):
+        tables = list(tables)
+        return cls(date, tables, DaySchedule.for_date(date, tables=tables), **kwargs)
+
+    @classmethod
+    async def afor_date(cls, date, tables, **kwargs):
+        tables = [table async for table in tables]
+        return cls(date, tables, await DaySchedule.afor_date(date, tables=tables), **kwargs)
+
+    def build_row(self, table_schedule):
+        row = bytearray(b'\x01') * len(self.slots)
+        for start, end in table_schedule.intervals:
+            # Slot i starts at opening + i * slot_minutes and clashes with
+            # the booking when it starts in (start - duration, end).
+            first = max(0, (start - self.duration - self.opening) // self.slot_minutes + 1)
+            last = min(len(row), -((self.opening - end) // self.slot_minutes))
+            if first < last:
+                row[first:last] = bytes(last - first)
+        return row
+
+    def slot_index(self, start_time):
+        offset = to_minutes(start_time) - self.opening
+        if offset < 0 or offset % self.slot_minutes or offset >= self.closing - self.opening:
+            return None
+        return offset // self.slot_minutes
+
+    def is_free(self, table_id, start_time):
+        i = self.slot_index(start_time)
+        return i is not None and bool(self.rows[table_id][i])
+
+    def any_free(self):
+        combined = 0
+        for row in self.rows.values():
+            combined |= int.from_bytes(row, 'big')
+        return combined.to_bytes(len(self.slots), 'big')
+
+    def labels(self):
+        return [format_minutes(minutes) for minutes in self.slots]
+
+    def table_rows(self):
+        labels = self.labels()
+        for table in self.tables:
+            yield table, list(zip(labels, self.rows[table.pk]))
+
+    def as_json(self):
+        return {
+            'date': self.date.isoformat(),
+            'duration': self.duration,
+            'slot_minutes': self.slot_minutes,
+            'slots': self.labels(),
+            'tables': [
+                {
+                    'id': table.id,
+                    'number': table.number,
+                    'capacity': table.capacity,
+                    'free': self.rows[table.pk].translate(FREE_SLOT_CHARS).decode(),
+                }
+                for table in self.tables
+            ],
+            'any_free': self.any_free().translate(FREE_SLOT_CHARS).decode(),
+        }
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    # ModelBackend with the user looked up for each authenticated request
+    # (the session's user id) kept in the cache for USER_CACHE_TIMEOUT
+    # seconds. Saving or deleting the user drops the entry, so role,
+    # password and is_active changes apply on the next request. That needs
+    # a cache shared by all workers, and CustomUser.objects.update() sends
+    # no signal, so settings only turn this on for redis or file caches.
+
+    def get_user(self, user_id):
+        timeout = settings.USER_CACHE_TIMEOUT
+        if not timeout:
+            return super().get_user(user_id)
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, timeout)
+        return user
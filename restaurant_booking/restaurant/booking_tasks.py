@@ -0,0 +1,38 @@
+from datetime import date, time
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+
+from .models import Booking
+from .tasks import task
+from .waitlist import promote_waitlist
+
+EMAIL_SUBJECTS = {
+    'created': "We've received your booking",
+    'confirmed': "Your booking is confirmed",
+    'cancelled': "Your booking has been cancelled",
+}
+
+
+def booking_email_key(booking_id, kind):
+    return f'booking-email:{booking_id}:{kind}'
+
+
+def waitlist_slot_key(table_id, date_value, time_value):
+    return f'waitlist:{table_id}:{date_value}:{time_value}'
+
+
+@task(max_attempts=5)
+def send_booking_email(booking_id, kind):
+    booking = Booking.objects.select_related('user', 'table', 'waitlist_entry').filter(pk=booking_id).first()
+    if booking is None or not booking.user.email:
+        return
+    waitlist = hasattr(booking, 'waitlist_entry')
+    message = render_to_string('restaurant/emails/booking.txt', {'booking': booking, 'kind': kind, 'waitlist': waitlist})
+    send_mail(EMAIL_SUBJECTS[kind], message, settings.DEFAULT_FROM_EMAIL, [booking.user.email])
+
+
+@task()
+def promote_waitlist_slot(table_id, date_value, time_value, duration):
+    promote_waitlist(table_id, date.fromisoformat(date_value), time.fromisoformat(time_value), duration)
@@ -0,0 +1,193 @@
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from heapq import merge
+from operator import attrgetter
+from xml.sax.saxutils import escape
+
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FORMATS = ('csv', 'xlsx')
+EXPORT_CHUNK_SIZE = 2000
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+BOOKING_EXPORT_HEADER = [
+    'ID', 'Date', 'Time', 'Duration', 'Customer', 'Email', 'Table', 'Guests',
+    'Status', 'Special Requests', 'Created',
+]
+
+CUSTOMER_EXPORT_HEADER = ['ID', 'Username', 'Email', 'First Name', 'Last Name', 'Joined', 'Role']
+
+
+class StreamBuffer:
+    # Write-only file object that holds whatever was written since the
+    # last drain(), so a writer's output can be handed on chunk by chunk.
+
+    def __init__(self, empty=b''):
+        self.empty = empty
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = self.empty.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def cell_value(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def csv_value(value):
+    # Spreadsheet apps evaluate cells starting with these characters as
+    # formulas, and special requests are free text typed by customers.
+    value = cell_value(value)
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+def stream_csv(header, rows):
+    buffer = StreamBuffer('')
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.drain()
+    for i, row in enumerate(rows, 1):
+        writer.writerow([csv_value(value) for value in row])
+        if i % 100 == 0:
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def xlsx_cell(value):
+    value = cell_value(value)
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c><v>{value}</v></c>'
+    text = escape(XML_INVALID_CHARS.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_row(row):
+    return ('<row>' + ''.join(xlsx_cell(value) for value in row) + '</row>').encode()
+
+
+def stream_xlsx(header, rows, sheet_name='Export'):
+    # A minimal single-sheet workbook with inline strings. zipfile writes
+    # to the non-seekable buffer using data descriptors, so each deflated
+    # chunk of the sheet can be sent as soon as it is produced.
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in XLSX_PARTS.items():
+            workbook.writestr(name, content.replace('{sheet_name}', escape(sheet_name, {'"': '&quot;'})))
+        yield buffer.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(xlsx_row(header))
+            for i, row in enumerate(rows, 1):
+                sheet.write(xlsx_row(row))
+                if i % 100 == 0:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+    yield buffer.drain()
+
+
+def export_response(format, filename, header, rows, sheet_name='Export'):
+    if format == 'xlsx':
+        response = StreamingHttpResponse(stream_xlsx(header, rows, sheet_name), content_type=XLSX_CONTENT_TYPE)
+    else:
+        response = StreamingHttpResponse(stream_csv(header, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{format}"'
+    return response
+
+
+# iterator() reads through a server-side cursor on PostgreSQL, so only one
+# chunk of rows is in memory at a time. The rows are read inside a
+# transaction: in autocommit mode Django declares the cursor WITH HOLD and
+# PostgreSQL materialises the whole result before returning the first row.
+
+def booking_export_rows(*querysets):
+    # Several querysets (live and archived bookings), each ordered by
+    # date, time and id, are merged into one stream in that order.
+    with transaction.atomic():
+        bookings = merge(
+            *(queryset.select_related('user', 'table').iterator(chunk_size=EXPORT_CHUNK_SIZE) for queryset in querysets),
+            key=attrgetter('date', 'time', 'id'),
+        )
+        for booking in bookings:
+            yield [
+                booking.id, booking.date, booking.time, booking.duration,
+                booking.user.username, booking.user.email, booking.table.number,
+                booking.number_of_guests, booking.get_status_display(),
+                booking.special_requests or '', booking.created_at,
+            ]
+
+
+def customer_export_rows(customers):
+    fields = ('id', 'username', 'email', 'first_name', 'last_name', 'date_joined', 'role')
+    with transaction.atomic():
+        yield from customers.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE)
@@ -1,6 +1,10 @@
 from django import forms
-from .models import Booking, Table, Menu, CustomUser
+from .models import Booking, Table, Menu, CustomUser, WaitlistEntry
+from .allocation import find_table
+from .importer import FORMAT_CHOICES
+from .recurring import MAX_SERIES_DATES, series_dates
 from django.contrib.auth.forms import UserCreationForm
+from django.utils import timezone
 from datetime import datetime, timedelta
 
 class UserRegistrationForm(UserCreationForm):
@@ -33,9 +37,56 @@ class BookingForm(forms.ModelForm):
         model = Booking
         fields = ['table', 'date', 'time', 'number_of_guests', 'special_requests']
         
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, auto_assign=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['date'].widget.attrs['min'] = datetime.now().strftime('%Y-%m-%d')
+        
+        self.auto_assign = auto_assign
+        if auto_assign:
+            del self.fields['table']
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        
+        if self.auto_assign and not self.errors:
+            table = find_table(
+                cleaned_data['number_of_guests'],
+                cleaned_data['date'],
+                cleaned_data['time'],
+                self.instance.duration,
+                exclude=self.instance.pk
+            )
+            if table is None:
+                raise forms.ValidationError("No table is available for your party at the selected time.")
+            self.instance.table = table
+        
+        return cleaned_data
+
+class WaitlistForm(forms.ModelForm):
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time'}))
+    
+    class Meta:
+        model = WaitlistEntry
+        fields = ['date', 'time', 'number_of_guests', 'special_requests']
+        
+    def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['date'].widget.attrs['min'] = datetime.now().strftime('%Y-%m-%d')
+        self.user = user
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        
+        if not self.errors:
+            if cleaned_data['date'] < timezone.now().date():
+                raise forms.ValidationError("You cannot join the waitlist for a past date.")
+            if WaitlistEntry.objects.filter(
+                user=self.user, date=cleaned_data['date'], time=cleaned_data['time'], status=WaitlistEntry.WAITING
+            ).exists():
+                raise forms.ValidationError("You are already on the waitlist for this time.")
+        
+        return cleaned_data
 
 class AdminBookingForm(forms.ModelForm):
     date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
@@ -43,7 +94,7 @@ class AdminBookingForm(forms.ModelForm):
     
     class Meta:
         model = Booking
-        fields = ['user', 'table', 'date', 'time', 'number_of_guests', 'special_requests', 'status']
+        fields = ['user', 'table', 'date', 'time', 'duration', 'number_of_guests', 'special_requests', 'status']
         
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -57,6 +108,55 @@ class AdminBookingForm(forms.ModelForm):
         if 'table' in self.fields:
             self.fields['table'].widget.attrs.update({'class': 'form-control select2'})
 
+class BookingSeriesForm(forms.Form):
+    REPEAT_CHOICES = [
+        ('', 'Does not repeat'),
+        ('1', 'Every week'),
+        ('2', 'Every 2 weeks'),
+        ('4', 'Every 4 weeks'),
+    ]
+    
+    user = forms.ModelChoiceField(queryset=CustomUser.objects.order_by('username'))
+    tables = forms.ModelMultipleChoiceField(queryset=Table.objects.order_by('number'))
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time'}))
+    duration = forms.IntegerField(min_value=Booking.MIN_DURATION, initial=Booking.DEFAULT_DURATION)
+    number_of_guests = forms.IntegerField(min_value=1)
+    repeat = forms.TypedChoiceField(choices=REPEAT_CHOICES, coerce=int, empty_value=None, required=False)
+    until = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    status = forms.ChoiceField(choices=[choice for choice in Booking.STATUS_CHOICES if choice[0] in Booking.ACTIVE_STATUSES])
+    special_requests = forms.CharField(required=False, widget=forms.Textarea(attrs={'rows': 3}))
+    skip_conflicts = forms.BooleanField(required=False, label="Book the other dates if some conflict")
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['start_date'].widget.attrs['min'] = datetime.now().strftime('%Y-%m-%d')
+        
+        for field_name, field in self.fields.items():
+            if field_name != 'skip_conflicts':
+                field.widget.attrs['class'] = 'form-control'
+        self.fields['user'].widget.attrs.update({'class': 'form-control select2'})
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        
+        if not self.errors:
+            start_date = cleaned_data['start_date']
+            until = cleaned_data['until']
+            if start_date < timezone.now().date():
+                raise forms.ValidationError("The series cannot start in the past.")
+            if cleaned_data['repeat']:
+                if until is None:
+                    raise forms.ValidationError("Choose the date the series ends.")
+                if until < start_date:
+                    raise forms.ValidationError("The series cannot end before it starts.")
+            
+            cleaned_data['dates'] = series_dates(start_date, until, cleaned_data['repeat'])
+            if len(cleaned_data['dates']) > MAX_SERIES_DATES:
+                raise forms.ValidationError(f"A series can have at most {MAX_SERIES_DATES} dates.")
+        
+        return cleaned_data
+
 class TableForm(forms.ModelForm):
     class Meta:
         model = Table
@@ -92,4 +192,20 @@ class MenuForm(forms.ModelForm):
             self.fields['price'].widget.attrs.update({
                 'min': '0.01', 
                 'step': '0.01'
-            })
\ No newline at end of file
+            })
+
+class ImportForm(forms.Form):
+    KIND_CHOICES = [
+        ('bookings', 'Bookings'),
+        ('tables', 'Tables'),
+        ('menu', 'Menu Items'),
+    ]
+    
+    kind = forms.ChoiceField(choices=KIND_CHOICES)
+    format = forms.ChoiceField(choices=[('', 'Detect from file name')] + FORMAT_CHOICES, required=False)
+    file = forms.FileField()
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field_name, field in self.fields.items():
+            field.widget.attrs['class'] = 'form-control'
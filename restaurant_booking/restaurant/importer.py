@@ -0,0 +1,234 @@
+import csv
+import io
+import json
+import time as timer
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+from .analytics import rebuild_booking_stats
+from .availability import DaySchedule
+from .models import Booking, Menu, Table
+
+FORMAT_CHOICES = [
+    ('csv', 'CSV'),
+    ('jsonl', 'JSON Lines'),
+]
+
+
+def detect_format(filename):
+    return 'csv' if filename.lower().endswith('.csv') else 'jsonl'
+
+
+def read_rows(stream, format):
+    # Yields (line number, row dict) from a binary file one record at a
+    # time. A record that cannot be parsed is yielded as None so it is
+    # reported like any other invalid row.
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(text, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_number, row if isinstance(row, dict) else None
+
+
+class Importer:
+    model = None
+    fields = ()
+
+    def __init__(self, batch_size=1000, progress_every=10000, on_progress=None, on_error=None, max_errors=None):
+        self.batch_size = batch_size
+        self.progress_every = progress_every
+        self.on_progress = on_progress
+        self.on_error = on_error
+        self.max_errors = max_errors
+        self.batch = []
+        self.rows = 0
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = None
+        self.elapsed = 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0
+
+    def clean_fields(self, row):
+        values, errors = {}, {}
+        for name in self.fields:
+            field = self.model._meta.get_field(name)
+            raw = row.get(name)
+            if raw is None or raw == '':
+                if field.has_default():
+                    values[name] = field.get_default()
+                    continue
+                if field.null:
+                    values[name] = None
+                    continue
+            try:
+                value = field.clean(raw, None)
+            except ValidationError as e:
+                errors[name] = e.messages
+                continue
+            if isinstance(field, models.DateTimeField) and settings.USE_TZ and timezone.is_naive(value):
+                value = timezone.make_aware(value)
+            values[name] = value
+        return values, errors
+
+    def build(self, row):
+        values, errors = self.clean_fields(row)
+        if errors:
+            raise ValidationError(errors)
+        return self.model(**values)
+
+    def accept(self, instance):
+        pass
+
+    def add_error(self, line, error):
+        messages = error.message_dict if hasattr(error, 'error_dict') else {NON_FIELD_ERRORS: error.messages}
+        self.error_count += 1
+        if self.max_errors is None or len(self.errors) < self.max_errors:
+            self.errors.append((line, messages))
+        if self.on_error:
+            self.on_error(line, messages)
+
+    def flush(self):
+        if not self.batch:
+            return
+        with transaction.atomic():
+            self.model.objects.bulk_create(self.batch)
+        self.created += len(self.batch)
+        self.batch = []
+
+    def finish(self):
+        self.flush()
+
+    def run(self, rows):
+        self.started = timer.perf_counter()
+        for line, row in rows:
+            self.rows += 1
+            try:
+                if row is None:
+                    raise ValidationError("This line is not a valid record.")
+                instance = self.build(row)
+            except ValidationError as e:
+                self.add_error(line, e)
+            else:
+                self.accept(instance)
+                self.batch.append(instance)
+                if len(self.batch) >= self.batch_size:
+                    self.flush()
+
+            if self.on_progress and self.rows % self.progress_every == 0:
+                self.elapsed = timer.perf_counter() - self.started
+                self.on_progress(self)
+        self.finish()
+        self.elapsed = timer.perf_counter() - self.started
+        return self
+
+
+class TableImporter(Importer):
+    model = Table
+    fields = ('number', 'capacity')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.numbers = set(Table.objects.values_list('number', flat=True))
+
+    def build(self, row):
+        table = super().build(row)
+        if table.number in self.numbers:
+            raise ValidationError({'number': ["A table with this number already exists."]})
+        return table
+
+    def accept(self, table):
+        self.numbers.add(table.number)
+
+
+class MenuImporter(Importer):
+    model = Menu
+    fields = ('name', 'description', 'price', 'category', 'image', 'is_available')
+
+
+class BookingImporter(Importer):
+    # Conflicts are checked against an in-memory DaySchedule per date,
+    # loaded with one query the first time the file mentions that date and
+    # extended with every accepted row, instead of running Booking.clean
+    # (two queries) per row. bulk_create bypasses the signals that
+    # maintain DailyBookingStats, so the imported date range is rebuilt
+    # at the end.
+    model = Booking
+    fields = ('date', 'time', 'duration', 'number_of_guests', 'special_requests', 'status', 'created_at')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.users = dict(get_user_model().objects.values_list('username', 'id'))
+        self.tables = {number: (pk, capacity) for pk, number, capacity in Table.objects.values_list('id', 'number', 'capacity')}
+        self.schedules = {}
+        self.first_date = None
+        self.last_date = None
+
+    def schedule(self, date):
+        if date not in self.schedules:
+            self.schedules[date] = DaySchedule.for_date(date)
+        return self.schedules[date]
+
+    def build(self, row):
+        values, errors = self.clean_fields(row)
+
+        user_id = self.users.get(str(row.get('user') or ''))
+        if user_id is None:
+            errors['user'] = ["No user with this username."]
+
+        table = None
+        try:
+            table = self.tables.get(int(row.get('table') or ''))
+        except (TypeError, ValueError):
+            pass
+        if table is None:
+            errors['table'] = ["No table with this number."]
+
+        if errors:
+            raise ValidationError(errors)
+
+        booking = Booking(user_id=user_id, table_id=table[0], **values)
+        if booking.status in Booking.ACTIVE_STATUSES and not self.schedule(booking.date).is_free(
+            booking.table_id, booking.time, booking.duration
+        ):
+            raise ValidationError("This table is already booked for the selected time.")
+        if booking.number_of_guests > table[1]:
+            raise ValidationError("The number of guests exceeds the table capacity.")
+        return booking
+
+    def accept(self, booking):
+        if booking.status in Booking.ACTIVE_STATUSES:
+            self.schedule(booking.date).reserve(booking.table_id, booking.time, booking.duration)
+        if self.first_date is None or booking.date < self.first_date:
+            self.first_date = booking.date
+        if self.last_date is None or booking.date > self.last_date:
+            self.last_date = booking.date
+
+    def finish(self):
+        super().finish()
+        if self.created:
+            rebuild_booking_stats(start_date=self.first_date, end_date=self.last_date)
+
+
+IMPORTERS = {
+    'bookings': BookingImporter,
+    'tables': TableImporter,
+    'menu': MenuImporter,
+}
@@ -0,0 +1,41 @@
+import time as timer
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from restaurant.archive import archive_bookings
+from restaurant.models import Booking
+
+
+class Command(BaseCommand):
+    help = (
+        "Move bookings older than --days (BOOKING_ARCHIVE_DAYS) from the live Booking table to "
+        "BookingArchive, in batches of one transaction each. Statistics, customer figures and "
+        "report exports include archived bookings. Safe to interrupt and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.BOOKING_ARCHIVE_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Only count the bookings that would be moved")
+
+    def handle(self, *args, **options):
+        if options['days'] < 1:
+            raise CommandError("--days must be at least 1; today's and future bookings are never archived")
+        before = timezone.now().date() - timedelta(days=options['days'])
+
+        if options['dry_run']:
+            count = Booking.objects.filter(date__lt=before).count()
+            self.stdout.write(f"{count} booking(s) dated before {before} would be archived")
+            return
+
+        started = timer.perf_counter()
+        total = 0
+        for moved in archive_bookings(before, options['batch_size']):
+            total += moved
+            self.stdout.write(f"Archived {total} booking(s)", ending='\r')
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} booking(s) dated before {before} in {timer.perf_counter() - started:.1f}s"
+        ))
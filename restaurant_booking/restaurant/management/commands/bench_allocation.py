@@ -0,0 +1,73 @@
+import random
+import statistics
+import time as timer
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from restaurant.allocation import find_table
+from restaurant.models import Booking, Table
+
+
+class Command(BaseCommand):
+    help = "Benchmark best-fit table allocation against a seeded day of bookings (rolled back afterwards)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tables', type=int, default=200)
+        parser.add_argument('--bookings', type=int, default=10000)
+        parser.add_argument('--lookups', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        booking_date = date.today() + timedelta(days=365)
+        slots = [time(hour, minute) for hour in range(10, 22) for minute in (0, 15, 30, 45)]
+
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(username='bench_allocation_user')
+            first_number = (Table.objects.order_by('-number').values_list('number', flat=True).first() or 0) + 1
+            tables = Table.objects.bulk_create([
+                Table(number=first_number + i, capacity=rng.choice([2, 2, 4, 4, 4, 6, 8, 10]))
+                for i in range(options['tables'])
+            ])
+            Booking.objects.bulk_create([
+                Booking(
+                    user=user,
+                    table=rng.choice(tables),
+                    date=booking_date,
+                    time=rng.choice(slots),
+                    number_of_guests=1,
+                    status=rng.choice(Booking.ACTIVE_STATUSES)
+                )
+                for i in range(options['bookings'])
+            ], batch_size=1000)
+
+            timings = []
+            queries = []
+            assigned = 0
+            for i in range(options['lookups']):
+                party_size = rng.randint(1, 10)
+                start_time = rng.choice(slots)
+                with CaptureQueriesContext(connection) as captured:
+                    started = timer.perf_counter()
+                    table = find_table(party_size, booking_date, start_time)
+                    timings.append((timer.perf_counter() - started) * 1000)
+                queries.append(len(captured))
+                assigned += table is not None
+
+            transaction.set_rollback(True)
+
+        timings.sort()
+        self.stdout.write(
+            f"{options['tables']} tables, {options['bookings']} bookings, {options['lookups']} lookups "
+            f"({assigned} assigned)"
+        )
+        self.stdout.write(
+            f"mean {statistics.mean(timings):.2f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.2f} ms, "
+            f"max {timings[-1]:.2f} ms, "
+            f"queries per lookup {max(queries)}"
+        )
@@ -0,0 +1,92 @@
+import asyncio
+import random
+import statistics
+import time as timer
+from datetime import timedelta, time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant.models import Booking, Table
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec of the async availability API with the sync booking view. "
+        "Requests go through Django's ASGI handler in-process, as under uvicorn, with "
+        "--concurrency requests in flight at once. Seed rows are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--tables', type=int, default=30)
+        parser.add_argument('--bookings', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def seed(self, options):
+        rng = random.Random(options['seed'])
+        self.date = timezone.now().date() + timedelta(days=1)
+        self.user = get_user_model().objects.create_user(username='bench-async-api', password='bench-async-api')
+        self.tables = Table.objects.bulk_create([
+            Table(number=100000 + i, capacity=rng.choice([2, 4, 6, 8])) for i in range(options['tables'])
+        ])
+        Booking.objects.bulk_create([
+            Booking(
+                user=self.user,
+                table=rng.choice(self.tables),
+                date=self.date,
+                time=time(rng.randint(11, 21), rng.choice([0, 15, 30, 45])),
+                status=rng.choice(Booking.ACTIVE_STATUSES),
+            )
+            for i in range(options['bookings'])
+        ])
+
+    def cleanup(self):
+        Booking.objects.filter(user=self.user).delete()
+        Table.objects.filter(pk__in=[table.pk for table in self.tables]).delete()
+        self.user.delete()
+
+    async def run(self, path, params, options):
+        client = AsyncClient()
+        await client.aforce_login(self.user)
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async def fetch(i):
+            async with semaphore:
+                started = timer.perf_counter()
+                response = await client.get(path, params)
+                return timer.perf_counter() - started, response.status_code == 200
+
+        started = timer.perf_counter()
+        results = await asyncio.gather(*(fetch(i) for i in range(options['requests'])))
+        return timer.perf_counter() - started, results
+
+    def report(self, label, elapsed, results):
+        latencies = sorted(duration * 1000 for duration, ok in results)
+        errors = sum(1 for duration, ok in results if not ok)
+        self.stdout.write(
+            f"{label:<24} {len(results) / elapsed:8.1f} req/s  "
+            f"p50 {statistics.median(latencies):7.1f} ms  "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1]:7.1f} ms  errors {errors}"
+        )
+
+    def handle(self, *args, **options):
+        self.seed(options)
+        try:
+            targets = [
+                ('async api_availability', reverse('api_availability'), {'date': self.date.isoformat(), 'time': '19:00'}),
+                ('sync booking_view', reverse('booking'), {}),
+            ]
+            self.stdout.write(f"{options['requests']} requests each, concurrency {options['concurrency']}")
+            # The test client always sends Host: testserver.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for label, path, params in targets:
+                    elapsed, results = asyncio.run(self.run(path, params, options))
+                    self.report(label, elapsed, results)
+        finally:
+            self.cleanup()
@@ -0,0 +1,263 @@
+import json
+import statistics
+import time as timer
+import tracemalloc
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from restaurant import urls
+from restaurant.middleware import QueryRecorder
+from restaurant.models import Booking, WaitlistEntry
+from restaurant.sample_data import generate_dataset
+
+# Differences below these are noise, whatever the relative tolerance.
+TIME_FLOOR_MS = 1.0
+MEMORY_FLOOR_KB = 64
+
+
+class Command(BaseCommand):
+    help = (
+        "Request every named route in restaurant/urls.py as the role it is meant for against a "
+        "generated dataset, and record query count, median wall time and peak Python memory per "
+        "view. With --save the results become the baseline; otherwise they are compared with it "
+        "and the command fails if any view got worse by more than the tolerances. "
+        "All generated rows are rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baseline', default='bench_views.json')
+        parser.add_argument('--save', action='store_true', help="Write the results as the new baseline")
+        parser.add_argument('--tables', type=int, default=500)
+        parser.add_argument('--users', type=int, default=50000)
+        parser.add_argument('--bookings', type=int, default=1000000)
+        parser.add_argument('--menu-items', type=int, default=200)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--query-tolerance', type=int, default=0, help="Extra queries allowed per view")
+        parser.add_argument('--time-tolerance', type=float, default=0.5, help="Allowed slowdown as a fraction")
+        parser.add_argument('--memory-tolerance', type=float, default=0.25, help="Allowed memory growth as a fraction")
+        parser.add_argument('--route', action='append', help="Only run these routes (for profiling, not baselines)")
+
+    def seed(self, options):
+        started = timer.perf_counter()
+        tables, menu_items, user_ids = generate_dataset(
+            tables=options['tables'],
+            users=options['users'],
+            bookings=options['bookings'],
+            menu_items=options['menu_items'],
+            seed=options['seed'],
+            prefix='bench',
+        )
+        User = get_user_model()
+        self.users = {
+            'admin': User.objects.create_user(username='bench-admin', role=User.ADMIN),
+            'customer': User.objects.create_user(username='bench-customer'),
+        }
+        table = max(tables, key=lambda table: table.capacity)
+        self.booking = Booking.objects.create(
+            user=self.users['customer'],
+            table=table,
+            date=timezone.now().date() + timedelta(days=1),
+            time=time(23, 0),
+            number_of_guests=2,
+        )
+        self.table = table
+        self.menu_item = menu_items[0]
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.stdout.write(
+            f"Seeded {options['tables']} tables, {options['users']} users, {options['bookings']} bookings, "
+            f"{options['menu_items']} menu items in {timer.perf_counter() - started:.1f}s"
+        )
+
+    def routes(self):
+        # name: (role, method, url kwargs, data). data may be a callable of
+        # the request number and url kwargs a callable, for requests that
+        # must differ on every call.
+        tomorrow = (timezone.now().date() + timedelta(days=1)).isoformat()
+        booking = {'booking_id': self.booking.id}
+        table = {'table_id': self.table.id}
+        menu = {'menu_id': self.menu_item.id}
+
+        def new_waitlist_entry():
+            entry = WaitlistEntry.objects.create(
+                user=self.users['customer'], date=self.booking.date, time=time(19, 0), number_of_guests=2,
+            )
+            return {'entry_id': entry.id}
+
+        def new_booking(i):
+            date = timezone.now().date() + timedelta(days=400 + i)
+            return json.dumps({'date': date.isoformat(), 'time': '19:00', 'number_of_guests': 2})
+
+        return {
+            'index': (None, 'get', {}, {}),
+            'menu': (None, 'get', {}, {}),
+            'booking': ('customer', 'get', {}, {'date': tomorrow}),
+            'booking_detail': ('customer', 'get', booking, {}),
+            'booking_edit': ('customer', 'get', booking, {}),
+            'booking_cancel': ('customer', 'get', booking, {}),
+            'booking_list': ('customer', 'get', {}, {}),
+            'waitlist_join': ('customer', 'get', {}, {'date': tomorrow, 'time': '19:00'}),
+            'waitlist_leave': ('customer', 'post', new_waitlist_entry, {}),
+            'login': (None, 'get', {}, {}),
+            'logout': ('customer', 'get', {}, {}),
+            'register': (None, 'get', {}, {}),
+            'api_availability': ('customer', 'get', {}, {'date': tomorrow, 'time': '19:00', 'guests': 2}),
+            'api_availability_grid': ('customer', 'get', {}, {'date': tomorrow}),
+            'api_booking_create': ('customer', 'post', {}, new_booking),
+            'api_booking_cancel': ('customer', 'post', booking, {}),
+            'admin_dashboard': ('admin', 'get', {}, {}),
+            'admin_bookings': ('admin', 'get', {}, {}),
+            'admin_bookings_bulk': ('admin', 'post', {}, {'action': 'confirm', 'selected': [self.booking.id]}),
+            'admin_booking_detail': ('admin', 'get', booking, {}),
+            'admin_booking_add': ('admin', 'get', {}, {}),
+            'admin_booking_series': ('admin', 'get', {}, {}),
+            'admin_booking_edit': ('admin', 'get', booking, {}),
+            'admin_booking_confirm': ('admin', 'get', booking, {}),
+            'admin_booking_cancel': ('admin', 'get', booking, {}),
+            'admin_booking_delete': ('admin', 'get', booking, {}),
+            'admin_booking_notes': ('admin', 'get', booking, {}),
+            'admin_tables': ('admin', 'get', {}, {}),
+            'admin_table_add': ('admin', 'get', {}, {}),
+            'admin_table_edit': ('admin', 'get', table, {}),
+            'admin_table_delete': ('admin', 'get', table, {}),
+            'admin_table_detail': ('admin', 'get', table, {}),
+            'admin_menu': ('admin', 'get', {}, {}),
+            'admin_menu_add': ('admin', 'get', {}, {}),
+            'admin_menu_edit': ('admin', 'get', menu, {}),
+            'admin_menu_delete': ('admin', 'get', menu, {}),
+            'admin_menu_toggle_availability': ('admin', 'get', menu, {}),
+            'admin_menu_duplicate': ('admin', 'get', menu, {}),
+            'admin_customers': ('admin', 'get', {}, {}),
+            'admin_customer_detail': ('admin', 'get', {'user_id': self.users['customer'].id}, {}),
+            'admin_waitlist': ('admin', 'get', {}, {'date': tomorrow}),
+            'admin_reports': ('admin', 'get', {}, {}),
+            'admin_import': ('admin', 'get', {}, {}),
+            'admin_settings': ('admin', 'get', {}, {}),
+            'admin_metrics': ('admin', 'get', {}, {}),
+        }
+
+    def measure(self, name, role, method, kwargs, data, repeat):
+        calls = iter(range(repeat + 2))
+
+        def request():
+            # Views that raise are recorded with their 500, not fatal.
+            client = Client(raise_request_exception=False)
+            if role:
+                client.force_login(self.users[role])
+            i = next(calls)
+            path = reverse(name, kwargs=kwargs() if callable(kwargs) else kwargs)
+            payload = data(i) if callable(data) else data
+            extra = {'content_type': 'application/json'} if callable(data) else {}
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                started = timer.perf_counter()
+                response = getattr(client, method)(path, payload, **extra)
+                elapsed = (timer.perf_counter() - started) * 1000
+            return response, elapsed, len(recorder.statements)
+
+        # The first call warms caches; the last is traced for memory only,
+        # since tracing slows everything down.
+        request()
+        timings = []
+        for i in range(repeat):
+            response, elapsed, queries = request()
+            timings.append(elapsed)
+
+        tracemalloc.start()
+        try:
+            request()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': response.status_code,
+            'queries': queries,
+            'time_ms': round(statistics.median(timings), 2),
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def regressions(self, result, base, options):
+        found = []
+        if result['queries'] > base['queries'] + options['query_tolerance']:
+            found.append(f"queries {base['queries']} -> {result['queries']}")
+        if result['time_ms'] > base['time_ms'] * (1 + options['time_tolerance']) + TIME_FLOOR_MS:
+            found.append(f"time {base['time_ms']:.1f} -> {result['time_ms']:.1f} ms")
+        if result['peak_kb'] > base['peak_kb'] * (1 + options['memory_tolerance']) + MEMORY_FLOOR_KB:
+            found.append(f"memory {base['peak_kb']:.0f} -> {result['peak_kb']:.0f} KB")
+        if result['status'] != base['status']:
+            found.append(f"status {base['status']} -> {result['status']}")
+        return found
+
+    def load_baseline(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            raise CommandError(f"{path} is not a valid baseline: {e}")
+
+    def handle(self, *args, **options):
+        dataset = {key: options[key] for key in ('tables', 'users', 'bookings', 'menu_items', 'seed')}
+        baseline = None if options['save'] else self.load_baseline(options['baseline'])
+        if baseline and baseline['dataset'] != dataset:
+            self.stderr.write(self.style.WARNING(
+                f"The baseline was recorded against a different dataset: {baseline['dataset']}"
+            ))
+
+        results = {}
+        with transaction.atomic():
+            self.seed(options)
+            routes = self.routes()
+            missing = {pattern.name for pattern in urls.urlpatterns if pattern.name} - set(routes)
+            if missing:
+                raise CommandError(f"No benchmark request defined for: {', '.join(sorted(missing))}")
+            names = options['route'] or list(routes)
+
+            # The test client always sends Host: testserver.
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for name in names:
+                    if name not in routes:
+                        raise CommandError(f"Unknown route: {name}")
+                    # A savepoint per view, so views that change data don't
+                    # affect the ones measured after them.
+                    with transaction.atomic():
+                        results[name] = self.measure(name, *routes[name], options['repeat'])
+                        transaction.set_rollback(True)
+            transaction.set_rollback(True)
+
+        failed = 0
+        self.stdout.write(f"{'view':<32} {'status':>6} {'queries':>7} {'time ms':>9} {'peak KB':>9}")
+        for name, result in results.items():
+            line = (
+                f"{name:<32} {result['status']:>6} {result['queries']:>7} "
+                f"{result['time_ms']:>9.1f} {result['peak_kb']:>9.0f}"
+            )
+            base = baseline and baseline['views'].get(name)
+            found = self.regressions(result, base, options) if base else []
+            if found:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f"{line}  REGRESSION: {'; '.join(found)}"))
+            else:
+                self.stdout.write(line)
+
+        if options['save']:
+            with open(options['baseline'], 'w') as f:
+                json.dump({'dataset': dataset, 'views': results}, f, indent=2, sort_keys=True)
+                f.write('\n')
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {options['baseline']}"))
+        elif baseline is None:
+            self.stdout.write(f"No baseline at {options['baseline']}; run with --save to record one")
+        elif failed:
+            raise CommandError(f"{failed} view(s) regressed against {options['baseline']}")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
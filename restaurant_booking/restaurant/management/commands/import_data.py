@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from restaurant.importer import FORMAT_CHOICES, IMPORTERS, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import bookings, tables or menu items from a CSV or JSON Lines file. "
+        "Columns are the model field names; bookings take the username in 'user' "
+        "and the table number in 'table'. Rows are validated and written in batches, "
+        "and invalid rows are reported on stderr without stopping the import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(IMPORTERS))
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=[value for value, label in FORMAT_CHOICES])
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--progress-every', type=int, default=10000)
+
+    def progress(self, importer):
+        self.stdout.write(
+            f"  {importer.rows} rows read, {importer.created} created, "
+            f"{importer.error_count} errors, {importer.rows_per_second:.0f} rows/s"
+        )
+
+    def error(self, line, messages):
+        for field, errors in messages.items():
+            for error in errors:
+                self.stderr.write(f"line {line}: {field}: {error}")
+
+    def handle(self, *args, **options):
+        format = options['format'] or detect_format(options['path'])
+        importer = IMPORTERS[options['kind']](
+            batch_size=options['batch_size'],
+            progress_every=options['progress_every'],
+            on_progress=self.progress,
+            on_error=self.error,
+            max_errors=0,
+        )
+        try:
+            stream = open(options['path'], 'rb')
+        except OSError as e:
+            raise CommandError(e)
+        with stream:
+            importer.run(read_rows(stream, format))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.created} {options['kind']} from {importer.rows} rows "
+            f"in {importer.elapsed:.1f}s ({importer.rows_per_second:.0f} rows/s), "
+            f"{importer.error_count} errors"
+        ))
@@ -0,0 +1,136 @@
+import http.cookiejar
+import statistics
+import threading
+import time as timer
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class ConnectionSampler(threading.Thread):
+    # Polls PostgreSQL for the number of backends connected to this
+    # database and, where the server tracks it (PostgreSQL 14+), the
+    # number of sessions opened since the run started.
+
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.sessions_opened = None
+        self.stopped = threading.Event()
+
+    def query(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+            return cursor.fetchone()[0]
+
+    def sessions(self):
+        try:
+            return self.query("SELECT sessions FROM pg_stat_database WHERE datname = current_database()")
+        except Exception:
+            return None
+
+    def run(self):
+        try:
+            sessions_before = self.sessions()
+            while not self.stopped.wait(self.interval):
+                self.samples.append(self.query(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE datname = current_database() AND pid <> pg_backend_pid()"
+                ))
+            sessions_after = self.sessions()
+            if sessions_before is not None and sessions_after is not None:
+                self.sessions_opened = sessions_after - sessions_before
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server and report latency and PostgreSQL connection usage. "
+        "Start the server with the DB_CONN_MODE under test and run this once per mode. "
+        "Persistent mode needs a server with long-lived worker threads (gunicorn, uwsgi); "
+        "runserver starts a thread per request, so only pool mode reuses connections there."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--path', default='/booking/1/')
+        parser.add_argument('--username')
+        parser.add_argument('--password')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--label', default='')
+        parser.add_argument('--sample-interval', type=float, default=0.1)
+
+    def open_session(self, options):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        if options['username']:
+            login_url = options['url'] + '/login/'
+            opener.open(login_url).read()
+            data = urllib.parse.urlencode({
+                'username': options['username'],
+                'password': options['password'],
+                'csrfmiddlewaretoken': self.csrf_token(opener),
+            }).encode()
+            request = urllib.request.Request(login_url, data=data, headers={'Referer': login_url})
+            opener.open(request).read()
+        return opener
+
+    def csrf_token(self, opener):
+        for handler in opener.handlers:
+            if isinstance(handler, urllib.request.HTTPCookieProcessor):
+                for cookie in handler.cookiejar:
+                    if cookie.name == 'csrftoken':
+                        return cookie.value
+        raise CommandError("The login page did not set a CSRF cookie")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Connection statistics need the PostgreSQL backend")
+
+        local = threading.local()
+        target = options['url'] + options['path']
+
+        def fetch(i):
+            if not hasattr(local, 'opener'):
+                local.opener = self.open_session(options)
+            started = timer.perf_counter()
+            try:
+                with local.opener.open(target) as response:
+                    response.read()
+                    ok = response.status == 200
+            except Exception:
+                ok = False
+            return timer.perf_counter() - started, ok
+
+        sampler = ConnectionSampler(options['sample_interval'])
+        sampler.start()
+        started = timer.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(fetch, range(options['requests'])))
+        elapsed = timer.perf_counter() - started
+        sampler.stopped.set()
+        sampler.join()
+
+        latencies = sorted(duration * 1000 for duration, ok in results)
+        errors = sum(1 for duration, ok in results if not ok)
+
+        label = f"[{options['label']}] " if options['label'] else ''
+        self.stdout.write(f"{label}{len(results)} requests to {target}, concurrency {options['concurrency']}")
+        self.stdout.write(
+            f"  throughput {len(results) / elapsed:.1f} req/s, errors {errors}\n"
+            f"  latency p50 {statistics.median(latencies):.1f} ms, "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1]:.1f} ms, "
+            f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f} ms"
+        )
+        if sampler.samples:
+            self.stdout.write(
+                f"  server connections: peak {max(sampler.samples)}, "
+                f"mean {statistics.mean(sampler.samples):.1f}"
+            )
+        if sampler.sessions_opened is not None:
+            self.stdout.write(f"  connections opened during run: {sampler.sessions_opened}")
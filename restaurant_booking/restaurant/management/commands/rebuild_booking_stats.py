@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from restaurant.analytics import rebuild_booking_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyBookingStats rollup from the Booking and BookingArchive tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        created = rebuild_booking_stats(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt booking statistics: {created} rows"))
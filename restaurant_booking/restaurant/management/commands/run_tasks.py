@@ -0,0 +1,56 @@
+import time as timer
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from restaurant import booking_tasks  # noqa: F401
+from restaurant.tasks import purge_finished, requeue_stale, run_pending
+
+# Seconds between deletions of tasks older than TASK_RETENTION_DAYS.
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background tasks: retries, delayed tasks and anything the web processes "
+        "didn't run after their commit. Several workers can run at once; each task is claimed "
+        "by exactly one. Tasks left running by a dead worker are requeued after TASK_TIMEOUT, "
+        "and finished tasks are deleted after TASK_RETENTION_DAYS."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Run the tasks that are due now and exit")
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        total = 0
+        purged_at = None
+        try:
+            while True:
+                close_old_connections()
+                if purged_at is None or timer.monotonic() - purged_at >= PURGE_INTERVAL:
+                    self.purge()
+                    purged_at = timer.monotonic()
+                requeued = requeue_stale()
+                if requeued:
+                    self.stderr.write(f"Requeued {requeued} stale task(s)")
+                ran = run_pending(options['batch_size'])
+                total += ran
+                if options['once'] and not ran:
+                    break
+                if not ran:
+                    timer.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Ran {total} task(s)"))
+
+    def purge(self):
+        if not settings.TASK_RETENTION_DAYS:
+            return
+        purged = purge_finished(timezone.now() - timedelta(days=settings.TASK_RETENTION_DAYS))
+        if purged:
+            self.stderr.write(f"Deleted {purged} finished task(s)")
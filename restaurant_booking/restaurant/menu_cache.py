@@ -0,0 +1,66 @@
+import weakref
+from contextvars import ContextVar
+from datetime import datetime, timezone as dt_timezone
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Menu
+
+NEVER_MODIFIED = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+last_touch_origin = ContextVar('menu_last_touch_origin', default=None)
+
+
+# The public menu is cached as a template fragment keyed on a version
+# derived from the Menu table itself (row count and latest updated_at),
+# so every worker computes the same token with one aggregate query and a
+# change is seen by all of them on their next request, whatever the
+# cache backend. The same state gives the page's ETag/Last-Modified.
+def menu_state(request=None):
+    state = getattr(request, '_menu_state', None)
+    if state is None:
+        figures = Menu.objects.aggregate(count=Count('id'), last_modified=Max('updated_at'))
+        last_modified = figures['last_modified'] or NEVER_MODIFIED
+        state = {
+            'version': f"{figures['count']}-{last_modified.strftime('%Y%m%d%H%M%S%f')}",
+            'last_modified': last_modified.replace(microsecond=0),
+        }
+        if request is not None:
+            request._menu_state = state
+    return state
+
+
+def touch_menu(origin=None):
+    # A deleted row leaves nothing behind to date the change, so the
+    # remaining rows are stamped to move Last-Modified forward. One
+    # delete() sends post_delete for every row with the same origin (the
+    # instance or queryset it was called on); only the first stamps.
+    if origin is not None:
+        touched = last_touch_origin.get()
+        if touched is not None and touched() is origin:
+            return
+        last_touch_origin.set(weakref.ref(origin))
+    Menu.objects.update(updated_at=timezone.now())
+
+
+def _has_pending_messages(request):
+    # A 304 makes the browser show its cached copy of the page, including
+    # whatever flash messages were rendered into it, so a page carrying
+    # new messages is never answered conditionally. len() doesn't mark
+    # the messages as read.
+    return len(get_messages(request)) > 0
+
+
+def menu_etag(request, *args, **kwargs):
+    if _has_pending_messages(request):
+        return None
+    variant = 'auth' if request.user.is_authenticated else 'anon'
+    return f"{menu_state(request)['version']}-{variant}"
+
+
+def menu_last_modified(request, *args, **kwargs):
+    if _has_pending_messages(request):
+        return None
+    return menu_state(request)['last_modified']
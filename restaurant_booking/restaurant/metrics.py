@@ -0,0 +1,149 @@
+import threading
+import time as timer
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.template.backends.django import DjangoTemplates, Template
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# URL names are a fixed set, but requests that don't resolve (404s,
+# scanners) must not add a label each.
+UNRESOLVED = '<unresolved>'
+MAX_VIEWS = 200
+OVERFLOW = '<other>'
+
+# Seconds spent rendering templates in the current request, when one is
+# being measured.
+template_time = ContextVar('template_time', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum:g}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.db_time = 0
+        self.template_time = 0
+        self.responses = {}
+
+
+class MetricsRegistry:
+    # Per-view request metrics, aggregated in this process. Memory is
+    # bounded by MAX_VIEWS times the fixed number of buckets.
+
+    METRICS = (
+        ('restaurant_request_duration_seconds', 'histogram', "Request latency by view", 'latency'),
+        ('restaurant_request_db_queries', 'histogram', "Database queries per request by view", 'queries'),
+        ('restaurant_response_size_bytes', 'histogram', "Response body size by view", 'response_size'),
+    )
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def reset(self):
+        with self.lock:
+            self.views = {}
+
+    def record(self, view, status, duration, queries, db_time, template_time, size=None):
+        with self.lock:
+            if view not in self.views and len(self.views) >= MAX_VIEWS:
+                view = OVERFLOW
+            metrics = self.views.get(view)
+            if metrics is None:
+                metrics = self.views[view] = ViewMetrics()
+            metrics.latency.observe(duration)
+            metrics.queries.observe(queries)
+            if size is not None:
+                metrics.response_size.observe(size)
+            metrics.db_time += db_time
+            metrics.template_time += template_time
+            metrics.responses[status] = metrics.responses.get(status, 0) + 1
+
+    def render(self):
+        # Prometheus text exposition format, version 0.0.4.
+        with self.lock:
+            views = sorted(self.views.items())
+            lines = []
+            for name, kind, help, attribute in self.METRICS:
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}']
+                for view, metrics in views:
+                    lines += getattr(metrics, attribute).lines(name, f'view="{view}"')
+
+            lines += [
+                '# HELP restaurant_requests_total Responses by view and status code',
+                '# TYPE restaurant_requests_total counter',
+            ]
+            for view, metrics in views:
+                for status, count in sorted(metrics.responses.items()):
+                    lines.append(f'restaurant_requests_total{{view="{view}",status="{status}"}} {count}')
+
+            for name, help, attribute in (
+                ('restaurant_db_time_seconds_total', "Time spent in database queries by view", 'db_time'),
+                ('restaurant_template_render_seconds_total', "Time spent rendering templates by view", 'template_time'),
+            ):
+                lines += [f'# HELP {name} {help}', f'# TYPE {name} counter']
+                for view, metrics in views:
+                    lines.append(f'{name}{{view="{view}"}} {getattr(metrics, attribute):g}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class TimedQueries:
+    def __init__(self):
+        self.count = 0
+        self.time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = timer.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += timer.perf_counter() - started
+            self.count += 1
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        started = timer.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            spent = template_time.get()
+            if spent is not None:
+                spent[0] += timer.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    # The Django template backend, timing each top-level render for the
+    # request metrics. Included templates are part of their parent's time.
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name).template, self)
@@ -0,0 +1,152 @@
+import cProfile
+import logging
+import os
+import random
+import re
+import time as timer
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .metrics import UNRESOLVED, TimedQueries, registry, template_time
+
+logger = logging.getLogger(__name__)
+
+SQL_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b|%s|\?")
+SQL_IN_LISTS = re.compile(r'\bIN \((?:\?, )*\?\)')
+
+
+def query_shape(sql):
+    # The statement with its literals and parameters replaced, so the same
+    # query run for different rows maps to the same shape.
+    shape = SQL_LITERALS.sub('?', sql)
+    return SQL_IN_LISTS.sub('IN (...)', shape)
+
+
+def repeated_queries(statements, threshold):
+    # Shapes of SELECTs issued at least `threshold` times: the signature of
+    # a related object or count being loaded once per row of a list.
+    shapes = Counter(query_shape(sql) for sql in statements if sql.lstrip().upper().startswith('SELECT'))
+    return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.statements.append(sql)
+        return execute(sql, params, many, context)
+
+
+class RepeatedQueryMiddleware:
+    # DEBUG only: logs a warning for each request that issues the same
+    # query shape N_PLUS_ONE_THRESHOLD or more times.
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+
+        for shape, count in repeated_queries(recorder.statements, self.threshold).items():
+            logger.warning("Possible N+1 query on %s: %d times: %s", request.path, count, shape)
+        return response
+
+
+class MetricsMiddleware:
+    # Records latency, database queries and time, template render time and
+    # response size per URL name into the metrics registry, served by the
+    # admin_metrics view. With METRICS_PROFILE_RATE = N, one in N requests
+    # (optionally only to METRICS_PROFILE_VIEWS) also runs under cProfile
+    # and the stats are written to METRICS_PROFILE_DIR.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.profile_rate = getattr(settings, 'METRICS_PROFILE_RATE', 0)
+        self.profile_views = getattr(settings, 'METRICS_PROFILE_VIEWS', None)
+        self.profile_dir = getattr(settings, 'METRICS_PROFILE_DIR', None)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        queries = TimedQueries()
+        templates = [0]
+        token = template_time.set(templates)
+        request.profiler = None
+
+        started = timer.perf_counter()
+        try:
+            with connection.execute_wrapper(queries):
+                response = self.get_response(request)
+        finally:
+            template_time.reset(token)
+            if request.profiler:
+                request.profiler.disable()
+        return self.record(request, response, timer.perf_counter() - started, queries, templates[0])
+
+    async def __acall__(self, request):
+        queries = TimedQueries()
+        templates = [0]
+        token = template_time.set(templates)
+        request.profiler = None
+        wrapper = ExitStack()
+
+        started = timer.perf_counter()
+        try:
+            # Under ASGI the ORM, sync views and process_view run in the
+            # request's thread-sensitive thread, not this one, so the query
+            # wrapper goes on that thread's connection and the profiler is
+            # stopped there.
+            await sync_to_async(lambda: wrapper.enter_context(connection.execute_wrapper(queries)))()
+            response = await self.get_response(request)
+        finally:
+            template_time.reset(token)
+            await sync_to_async(self.stop)(request, wrapper)
+        return self.record(request, response, timer.perf_counter() - started, queries, templates[0])
+
+    def stop(self, request, wrapper):
+        wrapper.close()
+        if request.profiler:
+            request.profiler.disable()
+
+    def record(self, request, response, duration, queries, template_seconds):
+        view = request.resolver_match.view_name if request.resolver_match else UNRESOLVED
+        size = None if response.streaming else len(response.content)
+        registry.record(view, response.status_code, duration, queries.count, queries.time, template_seconds, size)
+
+        if request.profiler:
+            self.dump_profile(request.profiler, view, duration)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if not self.profile_rate:
+            return None
+        if self.profile_views and request.resolver_match.view_name not in self.profile_views:
+            return None
+        if random.randrange(self.profile_rate) == 0:
+            request.profiler = cProfile.Profile()
+            request.profiler.enable()
+        return None
+
+    def dump_profile(self, profiler, view, duration):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        name = f"{view}-{timer.strftime('%Y%m%d-%H%M%S')}-{duration * 1000:.0f}ms-{os.getpid()}.prof"
+        profiler.dump_stats(os.path.join(self.profile_dir, re.sub(r'[^\w.-]', '_', name)))
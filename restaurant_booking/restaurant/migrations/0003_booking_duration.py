@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_alter_menu_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='duration',
+            field=models.PositiveIntegerField(default=90, help_text='Seating duration in minutes'),
+        ),
+    ]
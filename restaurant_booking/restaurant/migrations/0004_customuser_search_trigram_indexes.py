@@ -0,0 +1,46 @@
+from django.db import migrations
+
+
+SEARCH_COLUMNS = ['username', 'email', 'first_name', 'last_name']
+
+
+def index_name(column):
+    return f'restaurant_customuser_{column}_trgm'
+
+
+def trigram_available(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+# icontains compiles to UPPER("column"::text) LIKE UPPER(%s) on PostgreSQL,
+# so the trigram indexes are built over that exact expression. Servers
+# without the contrib package simply keep sequential-scan search.
+def create_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql' or not trigram_available(schema_editor.connection):
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {index_name(column)} ON restaurant_customuser '
+            f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {index_name(column)}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_booking_duration'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
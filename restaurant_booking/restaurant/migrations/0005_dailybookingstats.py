@@ -0,0 +1,47 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractHour
+
+
+def populate_daily_booking_stats(apps, schema_editor):
+    Booking = apps.get_model('restaurant', 'Booking')
+    DailyBookingStats = apps.get_model('restaurant', 'DailyBookingStats')
+    rows = (
+        Booking.objects.annotate(hour=ExtractHour('time'))
+        .order_by()
+        .values('date', 'table_id', 'status', 'hour')
+        .annotate(booking_count=Count('pk'), guest_count=Sum('number_of_guests'))
+    )
+    DailyBookingStats.objects.bulk_create(
+        (DailyBookingStats(**row) for row in rows.iterator(chunk_size=1000)),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0004_customuser_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyBookingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled')], max_length=10)),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('booking_count', models.IntegerField(default=0)),
+                ('guest_count', models.IntegerField(default=0)),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='restaurant.table')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'table', 'status', 'hour'), name='unique_daily_booking_stats')],
+            },
+        ),
+        migrations.RunPython(populate_daily_booking_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0005_dailybookingstats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['PENDING', 'CONFIRMED'])), fields=['date', 'table', 'time'], name='booking_active_slot_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date', 'time'], name='booking_date_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date', 'status'], name='booking_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-date', '-time'], name='booking_user_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['table', 'date'], name='booking_table_date_idx'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='table',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='restaurant.table'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
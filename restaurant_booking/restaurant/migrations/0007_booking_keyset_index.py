@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0006_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['date', 'time', 'id'], name='booking_date_time_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='booking',
+            name='booking_date_time_idx',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:28
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0007_booking_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('number_of_guests', models.IntegerField(default=1)),
+                ('special_requests', models.TextField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('WAITING', 'Waiting'), ('PROMOTED', 'Promoted'), ('CANCELLED', 'Cancelled')], default='WAITING', max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waitlist_entry', to='restaurant.booking')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'WAITING')), fields=['date', 'time', 'number_of_guests'], name='waitlist_waiting_slot_idx'), models.Index(fields=['user', 'date'], name='waitlist_user_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 13:35
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0011_menu_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='duration',
+            field=models.PositiveIntegerField(default=90, help_text='Seating duration in minutes', validators=[django.core.validators.MinValueValidator(15)]),
+        ),
+    ]
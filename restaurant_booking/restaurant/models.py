@@ -2,8 +2,10 @@ from django.utils import timezone
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.validators import MinValueValidator
 from django.forms import ValidationError
-from datetime import time
+from datetime import time, datetime, timedelta
 
 class CustomUser(AbstractUser):
     ADMIN = 'admin'
@@ -47,6 +49,8 @@ class Menu(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     image = models.URLField(max_length=200, null=True, blank=True)
     is_available = models.BooleanField(default=True)
+    # Also set by bulk_create; menu_cache versions the public menu on it.
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -57,29 +61,186 @@ class Booking(models.Model):
         ('CONFIRMED', 'Confirmed'),
         ('CANCELLED', 'Cancelled'),
     ]
+    ACTIVE_STATUSES = ['PENDING', 'CONFIRMED']
+    DEFAULT_DURATION = 90
+    # Shorter bookings would slip between others in the conflict checks.
+    MIN_DURATION = 15
     
-    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
-    table = models.ForeignKey(Table, on_delete=models.CASCADE)
+    # The composite indexes below lead with user and table, so the
+    # foreign keys don't need indexes of their own.
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, db_index=False)
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, db_index=False)
     date = models.DateField()
     time = models.TimeField(default=time(12, 0))
+    duration = models.PositiveIntegerField(
+        default=DEFAULT_DURATION, validators=[MinValueValidator(MIN_DURATION)], help_text="Seating duration in minutes"
+    )
     number_of_guests = models.IntegerField(default=1)
     special_requests = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
     created_at = models.DateTimeField(default=timezone.now)
     
+    class Meta:
+        indexes = [
+            # Availability checks: active bookings on a date, optionally for one table.
+            models.Index(
+                fields=['date', 'table', 'time'],
+                condition=models.Q(status__in=['PENDING', 'CONFIRMED']),
+                name='booking_active_slot_idx',
+            ),
+            # Dashboard day listing and the admin list's keyset pagination.
+            models.Index(fields=['date', 'time', 'id'], name='booking_date_time_id_idx'),
+            # Date range reports and the admin list's date + status filter.
+            models.Index(fields=['date', 'status'], name='booking_date_status_idx'),
+            # A customer's bookings, newest first.
+            models.Index(fields=['user', '-date', '-time'], name='booking_user_date_idx'),
+            # A table's bookings by date.
+            models.Index(fields=['table', 'date'], name='booking_table_date_idx'),
+        ]
+    
     def __str__(self):
         return f"Booking for {self.user.username} on {self.date} at {self.time}"
     
+    @property
+    def end_time(self):
+        return (datetime.combine(self.date, self.time) + timedelta(minutes=self.duration)).time()
+    
     def clean(self):
-        conflicting_bookings = Booking.objects.filter(
-            table=self.table,
-            date=self.date,
-            time=self.time,
-            status__in=['PENDING', 'CONFIRMED']
-        ).exclude(pk=self.pk)
+        from .availability import table_is_free
         
-        if conflicting_bookings.exists():
+        if self.table_id is None or self.date is None or self.time is None:
+            return
+        
+        if self.status in self.ACTIVE_STATUSES and not table_is_free(
+            self.table, self.date, self.time, self.duration, exclude=self.pk
+        ):
             raise ValidationError("This table is already booked for the selected time.")
         
         if self.number_of_guests > self.table.capacity:
-            raise ValidationError("The number of guests exceeds the table capacity.")
\ No newline at end of file
+            raise ValidationError("The number of guests exceeds the table capacity.")
+
+class BookingArchive(models.Model):
+    # Past bookings moved out of Booking by the archive_bookings command,
+    # under their original ids, so the live table only holds recent and
+    # upcoming ones. DailyBookingStats keeps counting them, and customer
+    # figures and report exports read both tables.
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, db_index=False, related_name='archived_bookings')
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, db_index=False, related_name='archived_bookings')
+    date = models.DateField()
+    time = models.TimeField()
+    duration = models.PositiveIntegerField()
+    number_of_guests = models.IntegerField()
+    special_requests = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # A customer's history.
+            models.Index(fields=['user', '-date', '-time'], name='archive_user_date_idx'),
+            # A table's history.
+            models.Index(fields=['table', 'date'], name='archive_table_date_idx'),
+            # Date range exports, in the live table's order.
+            models.Index(fields=['date', 'time', 'id'], name='archive_date_time_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived booking for {self.user.username} on {self.date} at {self.time}"
+
+class WaitlistEntry(models.Model):
+    WAITING = 'WAITING'
+    PROMOTED = 'PROMOTED'
+    CANCELLED = 'CANCELLED'
+
+    STATUS_CHOICES = [
+        (WAITING, 'Waiting'),
+        (PROMOTED, 'Promoted'),
+        (CANCELLED, 'Cancelled'),
+    ]
+
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, db_index=False)
+    date = models.DateField()
+    time = models.TimeField()
+    number_of_guests = models.IntegerField(default=1)
+    special_requests = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=WAITING)
+    booking = models.OneToOneField(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name='waitlist_entry')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Promotion: waiting parties on a date, in a start time window.
+            models.Index(
+                fields=['date', 'time', 'number_of_guests'],
+                condition=models.Q(status='WAITING'),
+                name='waitlist_waiting_slot_idx',
+            ),
+            # A customer's entries.
+            models.Index(fields=['user', 'date'], name='waitlist_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Waitlist for {self.user.username} on {self.date} at {self.time} ({self.number_of_guests})"
+
+class DailyBookingStats(models.Model):
+    date = models.DateField()
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='daily_stats')
+    status = models.CharField(max_length=10, choices=Booking.STATUS_CHOICES)
+    hour = models.PositiveSmallIntegerField()
+    booking_count = models.IntegerField(default=0)
+    guest_count = models.IntegerField(default=0)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'table', 'status', 'hour'], name='unique_daily_booking_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.date} table {self.table_id} {self.status} {self.hour}:00 ({self.booking_count})"
+
+
+class Task(models.Model):
+    QUEUED = 'QUEUED'
+    RUNNING = 'RUNNING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    kwargs = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    dedup_key = models.CharField(max_length=200, null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            # At most one queued task per dedup key; enqueueing another is a no-op.
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status='QUEUED'),
+                name='unique_queued_task_dedup_key',
+            ),
+        ]
+        indexes = [
+            # The worker's poll for due tasks.
+            models.Index(fields=['run_after'], condition=models.Q(status='QUEUED'), name='task_queued_run_after_idx'),
+            # Tasks left running by a worker that died.
+            models.Index(fields=['started_at'], condition=models.Q(status='RUNNING'), name='task_running_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status}, attempt {self.attempts}/{self.max_attempts})"
@@ -0,0 +1,119 @@
+import base64
+import json
+import operator
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+
+def estimate_count(queryset):
+    # The planner's row estimate for the filtered queryset: one EXPLAIN
+    # instead of a COUNT(*) that has to visit every matching row.
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']['Plan Rows']
+
+
+def encode_cursor(values):
+    data = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(model, ordering, cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(ordering):
+            return None
+        return [
+            model._meta.get_field(name.lstrip('-')).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except (TypeError, ValueError, ValidationError):
+        return None
+
+
+def keyset_filter(ordering, values, forward=True):
+    # Rows strictly after `values` in `ordering`, as
+    #   a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    # plus a redundant a >= x so the database can start an index range
+    # scan at the cursor instead of filtering from the first row.
+    terms = []
+    for i, (name, value) in enumerate(zip(ordering, values)):
+        descending = name.startswith('-')
+        field = name.lstrip('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        equal = {ordering[j].lstrip('-'): values[j] for j in range(i)}
+        terms.append(Q(**equal, **{f'{field}__{lookup}': value}))
+
+    first = ordering[0].lstrip('-')
+    bound = 'lte' if ordering[0].startswith('-') == forward else 'gte'
+    return Q(**{f'{first}__{bound}': values[0]}) & reduce(operator.or_, terms)
+
+
+def reverse_ordering(ordering):
+    return [name[1:] if name.startswith('-') else f'-{name}' for name in ordering]
+
+
+class KeysetPage:
+    def __init__(self, object_list, ordering, has_next, has_previous, estimated_count=None):
+        self.object_list = object_list
+        self.ordering = ordering
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.estimated_count = estimated_count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def cursor_for(self, obj):
+        return encode_cursor([getattr(obj, name.lstrip('-')) for name in self.ordering])
+
+    @property
+    def next_cursor(self):
+        return self.cursor_for(self.object_list[-1]) if self.has_next and self.object_list else None
+
+    @property
+    def previous_cursor(self):
+        return self.cursor_for(self.object_list[0]) if self.has_previous and self.object_list else None
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def keyset_paginate(queryset, ordering, per_page, after=None, before=None, last=False, estimate=False):
+    # Pages through `queryset` by the values of the last (or first) row
+    # shown instead of an OFFSET, so every page costs the same however deep
+    # it is. `ordering` must end in a unique field. Cursors that do not
+    # decode are ignored and the first page is shown.
+    ordering = list(ordering)
+    after = after and decode_cursor(queryset.model, ordering, after)
+    before = before and decode_cursor(queryset.model, ordering, before)
+    estimated_count = estimate_count(queryset) if estimate else None
+
+    if (before or last) and not after:
+        if before:
+            queryset = queryset.filter(keyset_filter(ordering, before, forward=False))
+        rows = list(queryset.order_by(*reverse_ordering(ordering))[:per_page + 1])
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next = bool(before)
+    else:
+        if after:
+            queryset = queryset.filter(keyset_filter(ordering, after))
+        rows = list(queryset.order_by(*ordering)[:per_page + 1])
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_previous = bool(after)
+
+    return KeysetPage(rows, ordering, has_next, has_previous, estimated_count)
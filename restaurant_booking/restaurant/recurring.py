@@ -0,0 +1,88 @@
+from datetime import timedelta
+from operator import attrgetter
+
+from django.db import transaction
+
+from .analytics import booking_state, record_bookings
+from .availability import DaySchedule
+from .booking_tasks import booking_email_key, send_booking_email
+from .models import Booking, Table
+from .services import lock_tables
+from .tasks import enqueue_many
+
+# Dates in one series; anything longer is most likely a mistyped end date.
+MAX_SERIES_DATES = 120
+
+
+def series_dates(start_date, until=None, every_weeks=None):
+    # start_date, then the same weekday every `every_weeks` weeks up to
+    # and including `until`. Without a repeat it is a single date, which
+    # makes a block booking of several tables for one evening.
+    if not every_weeks or until is None:
+        return [start_date]
+    step = timedelta(weeks=every_weeks)
+    dates = []
+    current = start_date
+    while current <= until:
+        dates.append(current)
+        current += step
+    return dates
+
+
+def series_conflicts(bookings):
+    # The occurrences in `bookings` (unsaved, with their tables loaded)
+    # that can't be booked, as (booking, reason) pairs. One query loads
+    # the active bookings of every table on every date of the series; each
+    # occurrence is then checked against those and the occurrences before
+    # it in memory, instead of two Booking.clean queries per occurrence.
+    schedules = DaySchedule.for_dates(
+        {booking.date for booking in bookings}, tables={booking.table_id for booking in bookings}
+    )
+    conflicts = []
+    for booking in sorted(bookings, key=attrgetter('date', 'time', 'table_id')):
+        schedule = schedules[booking.date]
+        if booking.number_of_guests > booking.table.capacity:
+            conflicts.append((booking, "The number of guests exceeds the table capacity."))
+        elif not schedule.is_free(booking.table_id, booking.time, booking.duration):
+            conflicts.append((booking, "This table is already booked for the selected time."))
+        else:
+            schedule.reserve(booking.table_id, booking.time, booking.duration)
+    return conflicts
+
+
+def create_series(user, tables, dates, time, number_of_guests, duration=None, special_requests=None,
+                  status='PENDING', skip_conflicts=False):
+    # Books every table in `tables` on every date in `dates` with one
+    # bulk_create, under the tables' row locks like save_booking. When an
+    # occurrence conflicts nothing is created, unless skip_conflicts is
+    # set, in which case the others are. Returns (created, conflicts).
+    with transaction.atomic():
+        lock_tables(Table.objects.filter(pk__in=[table.pk for table in tables]))
+        bookings = [
+            Booking(
+                user=user,
+                table=table,
+                date=date,
+                time=time,
+                duration=duration or Booking.DEFAULT_DURATION,
+                number_of_guests=number_of_guests,
+                special_requests=special_requests,
+                status=status,
+            )
+            for date in dates
+            for table in tables
+        ]
+        conflicts = series_conflicts(bookings)
+        if conflicts and not skip_conflicts:
+            return [], conflicts
+
+        # bulk_create skips the post_save receivers, so the rollup and the
+        # emails are done here for the whole series.
+        skipped = {id(booking) for booking, reason in conflicts}
+        created = Booking.objects.bulk_create([booking for booking in bookings if id(booking) not in skipped])
+        record_bookings([(booking_state(booking), 1) for booking in created])
+        enqueue_many(send_booking_email, {
+            booking_email_key(booking.pk, 'created'): {'booking_id': booking.pk, 'kind': 'created'}
+            for booking in created
+        })
+    return created, conflicts
@@ -0,0 +1,106 @@
+import random
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from .analytics import rebuild_booking_stats
+from .models import Booking, Menu, Table
+
+STATUS_WEIGHTS = [('PENDING', 2), ('CONFIRMED', 6), ('CANCELLED', 1)]
+
+SPECIAL_REQUESTS = ['', '', '', '', 'Window seat', 'Birthday', 'High chair', 'Vegetarian', 'Quiet corner']
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def booking_slots():
+    opening = datetime.combine(datetime.min, time.fromisoformat(settings.BOOKING_OPENING_TIME))
+    closing = datetime.combine(datetime.min, time.fromisoformat(settings.BOOKING_CLOSING_TIME))
+    step = timedelta(minutes=settings.BOOKING_SLOT_MINUTES)
+    slots = []
+    while opening + timedelta(minutes=Booking.DEFAULT_DURATION) <= closing:
+        slots.append(opening.time())
+        opening += step
+    return slots
+
+
+def generate_dataset(tables=500, users=50000, bookings=1000000, menu_items=200,
+                     past_days=365, future_days=60, seed=1, batch_size=5000, prefix='sample'):
+    # Bulk-inserts a restaurant's worth of rows without per-row validation
+    # or signals: bookings are spread over the date range with weighted
+    # statuses and may overlap. Objects are built lazily batch by batch, so
+    # memory stays flat however many rows are asked for. Booking stats are
+    # rebuilt at the end. Returns the created tables, menu items and users.
+    rng = random.Random(seed)
+    today = timezone.now().date()
+    User = get_user_model()
+
+    first_number = (Table.objects.order_by('-number').values_list('number', flat=True).first() or 0) + 1
+    table_objects = Table.objects.bulk_create([
+        Table(number=first_number + i, capacity=rng.choice([2, 2, 4, 4, 4, 6, 8]))
+        for i in range(tables)
+    ], batch_size=batch_size)
+
+    categories = [value for value, label in Menu.CATEGORY_CHOICES]
+    menu_objects = Menu.objects.bulk_create([
+        Menu(
+            name=f"{prefix.title()} dish {i}",
+            description=f"House {categories[i % len(categories)].lower()} number {i}",
+            price=Decimal(rng.randint(400, 4000)) / 100,
+            category=categories[i % len(categories)],
+            is_available=rng.random() > 0.1,
+        )
+        for i in range(menu_items)
+    ], batch_size=batch_size)
+
+    # Hashing a password per user would dominate the run; they all share one.
+    password = make_password(None)
+    user_ids = []
+    for batch in batched(range(users), batch_size):
+        created = User.objects.bulk_create([
+            User(
+                username=f"{prefix}{i}",
+                email=f"{prefix}{i}@example.com",
+                password=password,
+                date_joined=timezone.now() - timedelta(days=rng.randint(0, past_days)),
+            )
+            for i in batch
+        ])
+        user_ids.extend(user.pk for user in created)
+
+    slots = booking_slots()
+    statuses = [status for status, weight in STATUS_WEIGHTS]
+    weights = [weight for status, weight in STATUS_WEIGHTS]
+    capacities = [(table.pk, table.capacity) for table in table_objects]
+
+    def rows():
+        for i in range(bookings):
+            table_id, capacity = rng.choice(capacities)
+            yield Booking(
+                user_id=rng.choice(user_ids),
+                table_id=table_id,
+                date=today + timedelta(days=rng.randint(-past_days, future_days)),
+                time=rng.choice(slots),
+                number_of_guests=rng.randint(1, capacity),
+                status=rng.choices(statuses, weights)[0],
+                special_requests=rng.choice(SPECIAL_REQUESTS),
+            )
+
+    for batch in batched(rows(), batch_size):
+        Booking.objects.bulk_create(batch)
+
+    if bookings:
+        rebuild_booking_stats(
+            start_date=today - timedelta(days=past_days),
+            end_date=today + timedelta(days=future_days),
+        )
+    return table_objects, menu_objects, user_ids
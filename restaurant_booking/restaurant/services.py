@@ -0,0 +1,123 @@
+from operator import itemgetter
+
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.db import transaction
+from django.forms import ValidationError
+
+from .allocation import find_table
+from .analytics import batched_booking_stats, record_bookings
+from .availability import DaySchedule
+from .booking_tasks import booking_email_key, promote_waitlist_slot, send_booking_email, waitlist_slot_key
+from .models import Booking, Table
+from .sample_data import batched
+from .tasks import enqueue_many
+
+# Bookings per UPDATE ... WHERE id IN (...), well below every backend's
+# parameter limit.
+BULK_BATCH_SIZE = 1000
+
+BULK_FIELDS = ('pk', 'table_id', 'date', 'time', 'duration', 'number_of_guests', 'status')
+
+
+def lock_tables(tables):
+    # Rows are locked in primary key order so concurrent requests locking
+    # overlapping sets of tables never deadlock on each other.
+    return list(tables.select_for_update().order_by('pk').values_list('pk', flat=True))
+
+
+def save_booking(booking, auto_assign=False):
+    # The conflict check and the write run under a row lock on the booked
+    # table, so two requests racing for the same slot are serialised and
+    # the second one sees the first one's booking.
+    with transaction.atomic():
+        if auto_assign:
+            lock_tables(Table.objects.filter(capacity__gte=booking.number_of_guests))
+            table = find_table(
+                booking.number_of_guests, booking.date, booking.time, booking.duration, exclude=booking.pk
+            )
+            if table is None:
+                raise ValidationError({NON_FIELD_ERRORS: "No table is available for your party at the selected time."})
+            booking.table = table
+        else:
+            lock_tables(Table.objects.filter(pk=booking.table_id))
+
+        booking.full_clean()
+        booking.save()
+    return booking
+
+
+def reactivation_conflicts(rows):
+    # The rows (cancelled bookings about to become active again) that
+    # can't be: their table is taken at that time, or no longer seats the
+    # party. One query loads the active bookings of every table and date
+    # involved; the rows are then checked against those and each other in
+    # date and time order, so the earlier of two clashing rows wins.
+    tables = {row['table_id'] for row in rows}
+    capacities = dict(Table.objects.filter(pk__in=tables).values_list('pk', 'capacity'))
+    schedules = DaySchedule.for_dates({row['date'] for row in rows}, tables=tables)
+
+    conflicts = []
+    for row in sorted(rows, key=itemgetter('date', 'time', 'pk')):
+        schedule = schedules[row['date']]
+        if row['number_of_guests'] > capacities[row['table_id']] or not schedule.is_free(
+            row['table_id'], row['time'], row['duration']
+        ):
+            conflicts.append(row)
+        else:
+            schedule.reserve(row['table_id'], row['time'], row['duration'])
+    return conflicts
+
+
+def bulk_set_status(bookings, status):
+    # Moves every booking in the queryset that isn't in `status` yet to it
+    # with UPDATE ... WHERE id IN (...), instead of a save() each. What the
+    # post_save receivers would do per booking happens once for the set:
+    # one rollup update and one INSERT per kind of task. Cancelled
+    # bookings that would clash once active again are left as they are
+    # and returned as conflicts. Returns (changed, conflicts), lists of
+    # dicts of BULK_FIELDS as they were before the change.
+    with transaction.atomic():
+        if status in Booking.ACTIVE_STATUSES:
+            # Tables before bookings, in the same order as save_booking.
+            lock_tables(Table.objects.filter(pk__in=bookings.exclude(status__in=Booking.ACTIVE_STATUSES).values('table_id')))
+        rows = list(bookings.exclude(status=status).select_for_update().order_by('pk').values(*BULK_FIELDS))
+
+        conflicts = []
+        if status in Booking.ACTIVE_STATUSES:
+            reactivated = [row for row in rows if row['status'] not in Booking.ACTIVE_STATUSES]
+            if reactivated:
+                conflicts = reactivation_conflicts(reactivated)
+        skipped = {row['pk'] for row in conflicts}
+        changed = [row for row in rows if row['pk'] not in skipped]
+
+        for batch in batched([row['pk'] for row in changed], BULK_BATCH_SIZE):
+            Booking.objects.filter(pk__in=batch).update(status=status)
+
+        record_bookings([(row, -1) for row in changed] + [({**row, 'status': status}, 1) for row in changed])
+
+        kind = status.lower()
+        if kind in ('confirmed', 'cancelled'):
+            enqueue_many(send_booking_email, {
+                booking_email_key(row['pk'], kind): {'booking_id': row['pk'], 'kind': kind}
+                for row in changed
+            })
+        if kind == 'cancelled':
+            enqueue_many(promote_waitlist_slot, {
+                waitlist_slot_key(row['table_id'], row['date'], row['time']): {
+                    'table_id': row['table_id'],
+                    'date_value': row['date'],
+                    'time_value': row['time'],
+                    'duration': row['duration'],
+                }
+                for row in changed if row['status'] in Booking.ACTIVE_STATUSES
+            })
+    return changed, conflicts
+
+
+def bulk_delete(bookings):
+    # QuerySet.delete() already removes the rows in batches; the rollup
+    # decrements its post_delete receiver makes per booking are applied as
+    # one update. Returns the number of bookings deleted.
+    with transaction.atomic(), batched_booking_stats():
+        deleted, per_model = bookings.delete()
+    return per_model.get(Booking._meta.label, 0)
@@ -0,0 +1,72 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .analytics import STATS_FIELDS, booking_state, record_booking
+from .backends import invalidate_cached_user
+from .menu_cache import touch_menu
+from .models import Booking, BookingArchive, CustomUser, Menu
+from .booking_tasks import booking_email_key, promote_waitlist_slot, send_booking_email, waitlist_slot_key
+from .tasks import enqueue
+
+@receiver(pre_save, sender=Booking)
+def remember_booking_state(sender, instance, raw=False, **kwargs):
+    instance._stats_state = None
+    if instance.pk and not raw:
+        instance._stats_state = Booking.objects.filter(pk=instance.pk).values(*STATS_FIELDS).first()
+
+
+@receiver(post_save, sender=Booking)
+def update_stats_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_state', None)
+    current = booking_state(instance)
+    if previous == current:
+        return
+    if previous is not None:
+        record_booking(previous, -1)
+    record_booking(current, 1)
+
+
+@receiver(post_save, sender=Booking)
+def queue_booking_side_effects(sender, instance, created=False, raw=False, **kwargs):
+    # Emails and waitlist promotion run as tasks after the commit, so the
+    # request that changed the booking doesn't wait for them.
+    if raw:
+        return
+    previous = getattr(instance, '_stats_state', None)
+    if created:
+        kind = 'created'
+    elif previous is not None and previous['status'] != instance.status:
+        kind = instance.status.lower()
+    else:
+        return
+    if kind in ('created', 'confirmed', 'cancelled'):
+        enqueue(send_booking_email, dedup_key=booking_email_key(instance.pk, kind), booking_id=instance.pk, kind=kind)
+
+    if kind == 'cancelled' and previous['status'] in Booking.ACTIVE_STATUSES:
+        enqueue(
+            promote_waitlist_slot,
+            dedup_key=waitlist_slot_key(previous['table_id'], previous['date'], previous['time']),
+            table_id=previous['table_id'],
+            date_value=previous['date'],
+            time_value=previous['time'],
+            duration=instance.duration,
+        )
+
+
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=BookingArchive)
+def update_stats_on_delete(sender, instance, **kwargs):
+    record_booking(booking_state(instance), -1)
+
+
+@receiver(post_delete, sender=Menu)
+def touch_menu_on_delete(sender, origin=None, **kwargs):
+    touch_menu(origin)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_on_change(sender, instance, **kwargs):
+    invalidate_cached_user(instance.pk)
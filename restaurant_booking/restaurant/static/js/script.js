@@ -161,6 +161,69 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     });    
 
+    // --- Booking Availability Grid ---
+    const availabilityGrid = document.getElementById('availabilityGrid');
+
+    if (availabilityGrid) {
+        const dateInput = document.querySelector('input[name="date"]');
+        const timeInput = document.querySelector('input[name="time"]');
+        const guestsInput = document.querySelector('input[name="number_of_guests"]');
+
+        const renderGrid = (grid) => {
+            const body = availabilityGrid.querySelector('.grid-body');
+            body.innerHTML = '';
+            grid.tables.forEach(table => {
+                const row = document.createElement('div');
+                row.className = 'grid-row';
+                row.innerHTML = `<span class="grid-table">Table ${table.number} <small>(${table.capacity})</small></span>`;
+                const slots = document.createElement('div');
+                slots.className = 'grid-slots';
+                grid.slots.forEach((label, i) => {
+                    const slot = document.createElement('span');
+                    slot.className = table.free[i] === '1' ? 'slot free' : 'slot';
+                    slot.dataset.time = label;
+                    slot.title = label;
+                    slots.appendChild(slot);
+                });
+                row.appendChild(slots);
+                body.appendChild(row);
+            });
+            if (!grid.tables.length) {
+                body.innerHTML = '<p>No tables seat a party of this size.</p>';
+            }
+            availabilityGrid.querySelector('.grid-date').textContent = new Date(grid.date + 'T00:00').toLocaleDateString(
+                undefined, { weekday: 'long', day: 'numeric', month: 'long' }
+            );
+        };
+
+        const refreshGrid = () => {
+            if (!dateInput.value) {
+                return;
+            }
+            const params = new URLSearchParams({ date: dateInput.value });
+            if (guestsInput && guestsInput.value) {
+                params.set('guests', guestsInput.value);
+            }
+            fetch(`${availabilityGrid.dataset.url}?${params}`)
+                .then(response => response.ok ? response.json() : null)
+                .then(grid => grid && renderGrid(grid));
+        };
+
+        availabilityGrid.addEventListener('click', (e) => {
+            if (e.target.classList.contains('free') && timeInput) {
+                timeInput.value = e.target.dataset.time;
+                timeInput.focus();
+            }
+        });
+
+        if (dateInput) {
+            dateInput.addEventListener('change', refreshGrid);
+        }
+        if (guestsInput) {
+            guestsInput.addEventListener('change', refreshGrid);
+        }
+    }
+
     // --- Resize: Close Menu on Large Screens ---
     window.addEventListener('resize', () => {
         if (window.innerWidth > 992 && mainNav.classList.contains('active')) {
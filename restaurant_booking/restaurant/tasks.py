@@ -0,0 +1,186 @@
+import logging
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def task(max_attempts=3):
+    # Registers a function as a task under its dotted name. Tasks take
+    # keyword arguments only, and those must survive a JSON round trip.
+    def register(func):
+        name = f'{func.__module__}.{func.__name__}'
+        registry[name] = (func, max_attempts)
+        func.task_name = name
+        return func
+    return register
+
+
+def enqueue(func, dedup_key=None, delay=None, **kwargs):
+    # Stores the task in the caller's transaction, so it exists exactly
+    # when the change that caused it was committed, and hands it to the
+    # in-process executor once that commit happens. Returns None when a
+    # task with the same dedup_key is already queued.
+    name = func.task_name
+    try:
+        with transaction.atomic():
+            queued = Task.objects.create(
+                name=name,
+                kwargs=kwargs,
+                dedup_key=dedup_key,
+                max_attempts=registry[name][1],
+                run_after=timezone.now() + (delay or timedelta()),
+            )
+    except IntegrityError:
+        if dedup_key is None:
+            raise
+        return None
+
+    if settings.TASKS_RUN_IN_PROCESS and not delay:
+        transaction.on_commit(partial(submit, queued.pk))
+    return queued
+
+
+def enqueue_many(func, calls):
+    # enqueue for many calls of one task, as a single INSERT. `calls` maps
+    # each call's dedup_key to its kwargs; keys already queued are skipped.
+    if not calls:
+        return
+    name = func.task_name
+    now = timezone.now()
+    Task.objects.bulk_create(
+        [
+            Task(name=name, kwargs=kwargs, dedup_key=dedup_key, max_attempts=registry[name][1], run_after=now)
+            for dedup_key, kwargs in calls.items()
+        ],
+        ignore_conflicts=True,
+    )
+    if settings.TASKS_RUN_IN_PROCESS:
+        # Submitting a task that was already queued is harmless: only one
+        # claim of it succeeds.
+        queued = Task.objects.filter(status=Task.QUEUED, dedup_key__in=calls).values_list('pk', flat=True)
+        for task_id in queued:
+            transaction.on_commit(partial(submit, task_id))
+
+
+def get_executor():
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=settings.TASK_THREADS, thread_name_prefix='task')
+        return executor
+
+
+def submit(task_id):
+    get_executor().submit(run_in_thread, task_id)
+
+
+def run_in_thread(task_id):
+    close_old_connections()
+    try:
+        claimed = claim(Task.objects.filter(pk=task_id))
+        if claimed:
+            execute(claimed[0])
+    except Exception:
+        logger.exception("Task %s could not be run", task_id)
+    finally:
+        close_old_connections()
+
+
+def claim(tasks, limit=None):
+    # Marks due queued tasks RUNNING and returns them, oldest first. Tasks
+    # are locked while they are claimed, so the in-process executor and
+    # any number of workers never run the same task twice.
+    now = timezone.now()
+    with transaction.atomic():
+        due = (
+            tasks.filter(status=Task.QUEUED, run_after__lte=now)
+            .order_by('run_after', 'pk')
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)
+        )
+        ids = list(due[:limit] if limit else due)
+        if not ids:
+            return []
+        Task.objects.filter(pk__in=ids).update(status=Task.RUNNING, started_at=now, attempts=F('attempts') + 1)
+    return list(Task.objects.filter(pk__in=ids).order_by('run_after', 'pk'))
+
+
+def execute(queued):
+    entry = registry.get(queued.name)
+    try:
+        if entry is None:
+            raise LookupError(f"No task is registered as {queued.name}")
+        entry[0](**queued.kwargs)
+    except Exception:
+        logger.exception("Task %s failed (attempt %d of %d)", queued.name, queued.attempts, queued.max_attempts)
+        queued.last_error = traceback.format_exc()
+        if entry is not None and queued.attempts < queued.max_attempts:
+            queued.status = Task.QUEUED
+            queued.run_after = timezone.now() + timedelta(seconds=settings.TASK_RETRY_DELAY * 2 ** (queued.attempts - 1))
+        else:
+            queued.status = Task.FAILED
+            queued.finished_at = timezone.now()
+    else:
+        queued.status = Task.DONE
+        queued.finished_at = timezone.now()
+
+    try:
+        with transaction.atomic():
+            queued.save(update_fields=['status', 'run_after', 'finished_at', 'last_error'])
+    except IntegrityError:
+        # A retry collided with a newer queued task for the same dedup
+        # key, which will do the same work.
+        Task.objects.filter(pk=queued.pk).update(status=Task.DONE, finished_at=timezone.now())
+    return queued
+
+
+def requeue_stale():
+    # Tasks still RUNNING after TASK_TIMEOUT belonged to a worker that died.
+    # Each one is requeued only if it is still stale when updated: a task
+    # that finished since it was read must not run again.
+    cutoff = timezone.now() - timedelta(seconds=settings.TASK_TIMEOUT)
+    stale = Task.objects.filter(status=Task.RUNNING, started_at__lt=cutoff)
+    requeued = 0
+    for pk in list(stale.values_list('pk', flat=True)):
+        try:
+            with transaction.atomic():
+                requeued += stale.filter(pk=pk).update(status=Task.QUEUED)
+        except IntegrityError:
+            stale.filter(pk=pk).update(status=Task.DONE, finished_at=timezone.now())
+    return requeued
+
+
+def purge_finished(before, batch_size=1000):
+    # Deletes DONE and FAILED tasks that finished before `before`, a batch
+    # at a time so the table is never locked for long. Returns how many.
+    finished = Task.objects.filter(status__in=[Task.DONE, Task.FAILED], finished_at__lt=before)
+    purged = 0
+    while True:
+        ids = list(finished.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return purged
+        purged += Task.objects.filter(pk__in=ids).delete()[0]
+
+
+def run_pending(limit=100):
+    # Runs due tasks in this thread, oldest first; returns how many ran.
+    tasks = claim(Task.objects.all(), limit)
+    for queued in tasks:
+        execute(queued)
+    return len(tasks)
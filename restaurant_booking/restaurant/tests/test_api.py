@@ -0,0 +1,88 @@
+import json
+from datetime import timedelta, time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from restaurant.models import Table, Booking
+
+
+class BookingApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.small = Table.objects.create(number=1, capacity=2)
+        self.large = Table.objects.create(number=2, capacity=6)
+        self.date = timezone.now().date() + timedelta(days=1)
+        Booking.objects.create(user=self.user, table=self.small, date=self.date, time=time(19, 0), number_of_guests=2)
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json')
+
+    def test_availability(self):
+        response = self.client.get(reverse('api_availability'), {'date': self.date.isoformat(), 'time': '19:30'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([table['number'] for table in data['tables']], [1, 2])
+        self.assertEqual(data['tables'][0]['booked'], [['19:00', '20:30']])
+        self.assertFalse(data['tables'][0]['free'])
+        self.assertTrue(data['tables'][1]['free'])
+        self.assertEqual(data['free_tables'], 1)
+
+    def test_availability_filters_by_party_size(self):
+        response = self.client.get(reverse('api_availability'), {'date': self.date.isoformat(), 'guests': 4})
+        self.assertEqual([table['number'] for table in response.json()['tables']], [2])
+
+    def test_availability_rejects_bad_date(self):
+        response = self.client.get(reverse('api_availability'), {'date': 'tomorrow'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('date', response.json()['errors'])
+
+    async def test_availability_async_client(self):
+        response = await self.async_client.get(reverse('api_availability'), {'date': self.date.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['tables']), 2)
+
+    def test_availability_grid(self):
+        response = self.client.get(reverse('api_availability_grid'), {'date': self.date.isoformat(), 'guests': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['slots']), len(data['tables'][0]['free']))
+        free = dict(zip(data['slots'], data['tables'][0]['free']))
+        self.assertEqual((free['17:30'], free['17:45'], free['20:15'], free['20:30']), ('1', '0', '0', '1'))
+        self.assertEqual(set(data['tables'][1]['free']), {'1'})
+
+    def test_create_requires_login(self):
+        response = self.post_json(reverse('api_booking_create'), {})
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_assigns_free_table(self):
+        self.client.login(username="testuser", password="testpassword")
+        response = self.post_json(reverse('api_booking_create'), {
+            'date': self.date.isoformat(), 'time': '19:00', 'number_of_guests': 2,
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['table'], 2)
+        self.assertEqual(Booking.objects.filter(user=self.user).count(), 2)
+
+        response = self.post_json(reverse('api_booking_create'), {
+            'date': self.date.isoformat(), 'time': '19:00', 'number_of_guests': 2,
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('__all__', response.json()['errors'])
+
+    def test_cancel(self):
+        booking = Booking.objects.get(user=self.user)
+        self.client.login(username="testuser", password="testpassword")
+        response = self.client.post(reverse('api_booking_cancel', args=[booking.id]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'CANCELLED')
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, 'CANCELLED')
+
+    def test_cancel_other_users_booking(self):
+        booking = Booking.objects.get(user=self.user)
+        get_user_model().objects.create_user(username="other", password="testpassword")
+        self.client.login(username="other", password="testpassword")
+        response = self.client.post(reverse('api_booking_cancel', args=[booking.id]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,110 @@
+import csv
+import io
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from restaurant.analytics import customer_stats, favorite_table
+from restaurant.archive import archive_bookings
+from restaurant.models import Table, Booking, BookingArchive, WaitlistEntry
+from restaurant.tests.utils import BookingStatsAssertionsMixin
+
+
+class ArchiveBookingsTest(BookingStatsAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.other = Table.objects.create(number=2, capacity=4)
+        self.today = timezone.now().date()
+        self.old = [
+            Booking.objects.create(
+                user=self.user, table=self.table, date=self.today - timedelta(days=400 + i), time=time(19, 0),
+                number_of_guests=2, status=status,
+            )
+            for i, status in enumerate(['CONFIRMED', 'CONFIRMED', 'CANCELLED'])
+        ]
+        self.recent = [
+            Booking.objects.create(user=self.user, table=self.other, date=self.today - timedelta(days=3), number_of_guests=4, status='CONFIRMED'),
+            Booking.objects.create(user=self.user, table=self.other, date=self.today + timedelta(days=3), number_of_guests=3),
+        ]
+
+    def archive(self):
+        return sum(archive_bookings(self.today - timedelta(days=365), batch_size=2))
+
+    def test_moves_old_bookings_in_batches(self):
+        entry = WaitlistEntry.objects.create(
+            user=self.user, date=self.old[0].date, time=time(19, 0), status=WaitlistEntry.PROMOTED, booking=self.old[0]
+        )
+        stats = self.stats()
+
+        self.assertEqual(self.archive(), 3)
+
+        self.assertEqual(sorted(BookingArchive.objects.values_list('id', flat=True)), sorted(booking.pk for booking in self.old))
+        self.assertEqual(sorted(Booking.objects.values_list('id', flat=True)), sorted(booking.pk for booking in self.recent))
+        self.assertEqual(BookingArchive.objects.get(pk=self.old[2].pk).status, 'CANCELLED')
+        entry.refresh_from_db()
+        self.assertIsNone(entry.booking)
+        # The rollup still counts archived bookings, and a rebuild agrees.
+        self.assertEqual(self.stats(), stats)
+        self.assertStatsConsistent()
+        self.assertEqual(self.archive(), 0)
+
+    def test_deleting_archived_bookings_updates_stats(self):
+        self.archive()
+        BookingArchive.objects.filter(status='CONFIRMED').delete()
+        self.assertStatsConsistent()
+
+    def test_customer_figures_span_both_tables(self):
+        before = customer_stats(self.user.id, self.today)
+        self.archive()
+        after = customer_stats(self.user.id, self.today)
+
+        self.assertEqual(after, before)
+        self.assertEqual(
+            (after['bookings_count'], after['upcoming_bookings'], after['completed_bookings'], after['visits']),
+            (5, 1, 4, 3),
+        )
+        self.assertEqual(after['last_visit'], self.recent[0].date)
+        self.assertEqual(after['total_guests'], 13)
+        self.assertEqual(favorite_table(self.user.id), 1)
+
+    def test_customer_detail_lists_archived_bookings(self):
+        self.archive()
+        admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin_customer_detail', args=[self.user.id]))
+        self.assertEqual(
+            [booking.pk for booking in response.context['bookings']],
+            [booking.pk for booking in sorted(self.old + self.recent, key=lambda booking: booking.date, reverse=True)],
+        )
+        self.assertNotContains(response, "No bookings found for this customer")
+        self.assertNotContains(response, reverse('admin_booking_detail', args=[self.old[0].pk]))
+
+    def test_report_export_includes_archived_bookings(self):
+        self.archive()
+        admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin_reports'), {
+            'type': 'bookings',
+            'period': 'custom',
+            'start_date': (self.today - timedelta(days=500)).isoformat(),
+            'end_date': (self.today + timedelta(days=30)).isoformat(),
+            'export': 'csv',
+        })
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))[1:]
+        self.assertEqual(
+            [int(row[0]) for row in rows],
+            [booking.pk for booking in sorted(self.old + self.recent, key=lambda booking: booking.date)],
+        )
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('archive_bookings', '--days', '365', '--dry-run', stdout=out)
+        self.assertIn("3 booking(s)", out.getvalue())
+        self.assertEqual(BookingArchive.objects.count(), 0)
+
+        call_command('archive_bookings', '--days', '365', stdout=io.StringIO())
+        self.assertEqual(BookingArchive.objects.count(), 3)
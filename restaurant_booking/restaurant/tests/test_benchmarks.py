@@ -0,0 +1,36 @@
+import io
+import json
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from restaurant.models import Booking
+
+
+class BenchViewsCommandTest(TestCase):
+    def bench(self, baseline, **options):
+        call_command(
+            'bench_views', baseline=baseline, tables=5, users=20, bookings=200, menu_items=10, repeat=1,
+            stdout=io.StringIO(), stderr=io.StringIO(), **options
+        )
+
+    def test_baseline_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            self.bench(path, save=True)
+            with open(path) as f:
+                baseline = json.load(f)
+            self.assertEqual(baseline['views']['booking_list']['status'], 200)
+            self.assertGreater(baseline['views']['admin_bookings']['queries'], 0)
+            self.assertFalse(Booking.objects.exists())
+
+            # Time and memory are too noisy to assert on here; queries are not.
+            self.bench(path, time_tolerance=100, memory_tolerance=100)
+
+            baseline['views']['admin_bookings']['queries'] -= 1
+            with open(path, 'w') as f:
+                json.dump(baseline, f)
+            with self.assertRaisesMessage(CommandError, "1 view(s) regressed"):
+                self.bench(path, time_tolerance=100, memory_tolerance=100)
@@ -2,7 +2,8 @@ from django.test import TestCase
 from django import forms
 from django.contrib.auth import get_user_model
 from restaurant.forms import BookingForm, UserRegistrationForm, MenuForm
-from restaurant.models import Table, Menu
+from restaurant.models import Table, Menu, Booking
+from datetime import date, time
 
 class BookingFormTest(TestCase):
     def setUp(self):
@@ -32,6 +33,39 @@ class BookingFormTest(TestCase):
         self.assertFalse(form.is_valid())
         self.assertIn('The number of guests exceeds the table capacity.', form.errors['number_of_guests'])
 
+class BookingFormAutoAssignTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.large = Table.objects.create(number=1, capacity=8)
+        self.small = Table.objects.create(number=2, capacity=2)
+        self.medium = Table.objects.create(number=3, capacity=4)
+        self.form_data = {
+            'date': '2030-03-22',
+            'time': '19:00',
+            'number_of_guests': 3
+        }
+
+    def test_table_field_is_left_out(self):
+        form = BookingForm(auto_assign=True)
+        self.assertNotIn('table', form.fields)
+
+    def test_assigns_smallest_fitting_table(self):
+        form = BookingForm(data=self.form_data, auto_assign=True)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.instance.table, self.medium)
+
+    def test_skips_booked_table(self):
+        Booking.objects.create(user=self.user, table=self.medium, date=date(2030, 3, 22), time=time(18, 30))
+        form = BookingForm(data=self.form_data, auto_assign=True)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.instance.table, self.large)
+
+    def test_no_table_available(self):
+        form = BookingForm(data=dict(self.form_data, number_of_guests=12), auto_assign=True)
+        self.assertFalse(form.is_valid())
+        self.assertIn('No table is available for your party at the selected time.', form.non_field_errors())
+
+
 class UserRegistrationFormTest(TestCase):
     def test_user_registration_form_valid(self):
         form_data = {
@@ -0,0 +1,80 @@
+import io
+import json
+from datetime import date, time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from restaurant.importer import BookingImporter, MenuImporter, TableImporter, read_rows
+from restaurant.models import Table, Menu, Booking, DailyBookingStats
+
+
+def csv_file(*lines):
+    return io.BytesIO('\n'.join(lines).encode())
+
+
+class BookingImporterTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+        Booking.objects.create(user=self.user, table=self.table, date=date(2030, 1, 1), time=time(19, 0))
+
+    def test_import(self):
+        stream = csv_file(
+            'user,table,date,time,number_of_guests,status',
+            'testuser,1,2030-01-01,12:00,2,CONFIRMED',
+            'testuser,1,2030-01-01,12:30,2,PENDING',
+            'testuser,1,2030-01-01,19:30,2,PENDING',
+            'testuser,1,2030-01-01,19:30,2,CANCELLED',
+            'testuser,1,2030-01-02,19:00,6,PENDING',
+            'nobody,9,2030-01-02,19:00,2,PENDING',
+            'testuser,1,2030-01-02,25:00,2,UNKNOWN',
+        )
+        importer = BookingImporter(batch_size=2, max_errors=10)
+        # The stats rebuild at the end reads Booking and BookingArchive.
+        with self.assertNumQueries(11):
+            importer.run(read_rows(stream, 'csv'))
+
+        self.assertEqual(importer.rows, 7)
+        self.assertEqual(importer.created, 2)
+        self.assertEqual(Booking.objects.count(), 3)
+        self.assertEqual([line for line, errors in importer.errors], [3, 4, 6, 7, 8])
+        self.assertEqual(importer.errors[0][1], {'__all__': ["This table is already booked for the selected time."]})
+        self.assertEqual(importer.errors[1][1], {'__all__': ["This table is already booked for the selected time."]})
+        self.assertEqual(set(importer.errors[2][1]), {'__all__'})
+        self.assertEqual(set(importer.errors[3][1]), {'user', 'table'})
+
+    def test_stats_cover_imported_rows(self):
+        stream = csv_file(
+            'user,table,date,time,number_of_guests,status',
+            'testuser,1,2030-01-02,12:00,3,CONFIRMED',
+        )
+        BookingImporter().run(read_rows(stream, 'csv'))
+        stats = DailyBookingStats.objects.get(date=date(2030, 1, 2))
+        self.assertEqual((stats.booking_count, stats.guest_count, stats.hour), (1, 3, 12))
+        self.assertTrue(DailyBookingStats.objects.filter(date=date(2030, 1, 1), booking_count=1).exists())
+
+
+class TableImporterTest(TestCase):
+    def test_duplicate_numbers_are_rejected(self):
+        Table.objects.create(number=1, capacity=4)
+        stream = csv_file('number,capacity', '1,2', '2,2', '2,6', '3,x')
+        importer = TableImporter().run(read_rows(stream, 'csv'))
+        self.assertEqual(importer.created, 1)
+        self.assertEqual([line for line, errors in importer.errors], [2, 4, 5])
+        self.assertEqual(Table.objects.get(number=2).capacity, 2)
+
+
+class MenuImporterTest(TestCase):
+    def test_json_lines(self):
+        lines = [
+            json.dumps({'name': 'Soup', 'description': 'Hot', 'price': '4.50', 'category': 'SOUP'}),
+            '',
+            '{not json',
+            json.dumps({'name': 'Cake', 'description': 'Sweet', 'price': 5, 'category': 'DESSERT', 'is_available': False}),
+            json.dumps({'name': 'Mystery', 'description': '', 'price': 'free', 'category': 'OTHER'}),
+        ]
+        importer = MenuImporter().run(read_rows(io.BytesIO('\n'.join(lines).encode()), 'jsonl'))
+        self.assertEqual(importer.created, 2)
+        self.assertEqual([line for line, errors in importer.errors], [3, 5])
+        self.assertEqual(set(importer.errors[1][1]), {'description', 'price', 'category'})
+        self.assertFalse(Menu.objects.get(name='Cake').is_available)
@@ -3,7 +3,9 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from restaurant.models import Table, Menu, Booking
 from django.utils import timezone
-from datetime import timedelta
+from datetime import timedelta, time
+from restaurant.availability import AvailabilityGrid, DaySchedule, TableSchedule
+from restaurant.tests.utils import BookingStatsAssertionsMixin
 
 
 class CustomUserModelTest(TestCase):
@@ -96,6 +98,125 @@ class BookingModelTest(TestCase):
         with self.assertRaises(ValidationError):
             booking.clean() 
 
+    def test_overlapping_booking_is_rejected(self):
+        date = timezone.now().date()
+        Booking.objects.create(user=self.user, table=self.table, date=date, time=time(19, 0), duration=90)
+
+        overlapping = Booking(user=self.user, table=self.table, date=date, time=time(19, 15))
+        with self.assertRaises(ValidationError):
+            overlapping.clean()
+
+        earlier = Booking(user=self.user, table=self.table, date=date, time=time(18, 0), duration=60)
+        earlier.clean()
+
+        later = Booking(user=self.user, table=self.table, date=date, time=time(20, 30))
+        later.clean()
+
+    def test_cancelled_booking_frees_the_table(self):
+        date = timezone.now().date()
+        Booking.objects.create(
+            user=self.user, table=self.table, date=date, time=time(19, 0), status='CANCELLED'
+        )
+        Booking(user=self.user, table=self.table, date=date, time=time(19, 0)).clean()
+
+    def test_duration_has_a_minimum(self):
+        booking = Booking(user=self.user, table=self.table, date=timezone.now().date(), time=time(19, 0), duration=0)
+        with self.assertRaises(ValidationError) as raised:
+            booking.full_clean()
+        self.assertIn('duration', raised.exception.message_dict)
+
+        booking.duration = Booking.MIN_DURATION
+        booking.full_clean()
+
+    def test_end_time(self):
+        booking = Booking(user=self.user, table=self.table, date=timezone.now().date(), time=time(19, 0), duration=90)
+        self.assertEqual(booking.end_time, time(20, 30))
+
+
+class TableScheduleTest(TestCase):
+    def test_is_free(self):
+        schedule = TableSchedule([(1140, 1230), (720, 810)])
+        self.assertTrue(schedule.is_free(810, 900))
+        self.assertTrue(schedule.is_free(600, 720))
+        self.assertFalse(schedule.is_free(1155, 1245))
+        self.assertFalse(schedule.is_free(700, 730))
+        self.assertFalse(schedule.is_free(600, 1400))
+
+    def test_long_interval_covers_later_starts(self):
+        schedule = TableSchedule([(600, 1000), (700, 720)])
+        self.assertFalse(schedule.is_free(800, 850))
+
+    def test_add(self):
+        schedule = TableSchedule()
+        self.assertTrue(schedule.is_free(720, 810))
+        schedule.add(720, 810)
+        self.assertFalse(schedule.is_free(780, 840))
+        self.assertEqual(len(schedule), 1)
+
+
+class AvailabilityGridTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.other = Table.objects.create(number=2, capacity=2)
+        self.date = timezone.now().date()
+        Booking.objects.create(user=self.user, table=self.table, date=self.date, time=time(19, 0))
+
+    def grid(self):
+        return AvailabilityGrid.for_date(
+            self.date, Table.objects.order_by('number'), opening=time(17, 0), closing=time(22, 0), slot_minutes=30
+        )
+
+    def test_grid_matches_schedule(self):
+        grid = self.grid()
+        schedule = DaySchedule.for_date(self.date)
+        for table in (self.table, self.other):
+            for label in grid.labels():
+                start_time = time(*map(int, label.split(':')))
+                self.assertEqual(grid.is_free(table.pk, start_time), schedule.is_free(table.pk, start_time))
+
+    def test_as_json(self):
+        with self.assertNumQueries(2):
+            data = self.grid().as_json()
+        self.assertEqual(data['slots'][0], '17:00')
+        self.assertEqual(len(data['slots']), 10)
+        self.assertEqual(data['tables'][0]['free'], '1100000111')
+        self.assertEqual(data['tables'][1]['free'], '1111111111')
+        self.assertEqual(data['any_free'], '1111111111')
+
+    def test_off_grid_times_are_not_free(self):
+        grid = self.grid()
+        self.assertFalse(grid.is_free(self.other.pk, time(17, 10)))
+        self.assertFalse(grid.is_free(self.other.pk, time(22, 0)))
+
+
+class DailyBookingStatsTest(BookingStatsAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.date = timezone.now().date()
+
+    def test_stats_follow_booking_changes(self):
+        booking = Booking.objects.create(user=self.user, table=self.table, date=self.date, time=time(19, 0), number_of_guests=3)
+        Booking.objects.create(user=self.user, table=self.table, date=self.date, time=time(19, 30), number_of_guests=2)
+        self.assertEqual(self.stats(), {(self.date, self.table.id, 'PENDING', 19): (2, 5)})
+
+        booking.status = 'CONFIRMED'
+        booking.time = time(12, 0)
+        booking.save()
+        self.assertEqual(self.stats(), {
+            (self.date, self.table.id, 'PENDING', 19): (1, 2),
+            (self.date, self.table.id, 'CONFIRMED', 12): (1, 3),
+        })
+
+        booking.delete()
+        self.assertEqual(self.stats(), {(self.date, self.table.id, 'PENDING', 19): (1, 2)})
+
+    def test_rebuild_matches_incremental_stats(self):
+        for hour, status in [(12, 'PENDING'), (13, 'CONFIRMED'), (19, 'CANCELLED'), (19, 'PENDING')]:
+            Booking.objects.create(user=self.user, table=self.table, date=self.date, time=time(hour, 0), status=status)
+        self.assertStatsConsistent()
+
 
 class MenuItemImageTest(TestCase):
     def test_image_url_field(self):
@@ -0,0 +1,55 @@
+from datetime import date, time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from restaurant.models import Table, Booking
+from restaurant.pagination import keyset_paginate, encode_cursor
+
+
+class KeysetPaginationTest(TestCase):
+    ORDERING = ('-date', '-time', '-id')
+
+    @classmethod
+    def setUpTestData(cls):
+        user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        table = Table.objects.create(number=1, capacity=4)
+        # Repeated dates and times so pages split inside runs of equal keys.
+        Booking.objects.bulk_create([
+            Booking(user=user, table=table, date=date(2030, 1, 1 + i % 3), time=time(12 + i % 2, 0))
+            for i in range(23)
+        ])
+        cls.expected = list(Booking.objects.order_by(*cls.ORDERING).values_list('id', flat=True))
+
+    def paginate(self, **kwargs):
+        return keyset_paginate(Booking.objects.all(), self.ORDERING, 5, **kwargs)
+
+    def test_walk_forward_and_back(self):
+        pages = [self.paginate()]
+        while pages[-1].has_next:
+            pages.append(self.paginate(after=pages[-1].next_cursor))
+        self.assertEqual([booking.id for page in pages for booking in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+        self.assertFalse(pages[0].has_previous)
+
+        page = pages[-1]
+        seen = []
+        while page.has_previous:
+            page = self.paginate(before=page.previous_cursor)
+            seen = [booking.id for booking in page] + seen
+        self.assertEqual(seen, self.expected[:20])
+
+    def test_last_page(self):
+        page = self.paginate(last=True)
+        self.assertEqual([booking.id for booking in page], self.expected[-5:])
+        self.assertFalse(page.has_next)
+        self.assertTrue(page.has_previous)
+
+    def test_invalid_cursor_shows_first_page(self):
+        for cursor in ('garbage', encode_cursor(['x', 'y', 'z']), encode_cursor([1])):
+            page = self.paginate(after=cursor)
+            self.assertEqual([booking.id for booking in page], self.expected[:5])
+
+    def test_page_costs_one_query(self):
+        cursor = self.paginate().next_cursor
+        with self.assertNumQueries(1):
+            self.paginate(after=cursor)
@@ -0,0 +1,78 @@
+import random
+from datetime import timedelta, time
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from restaurant.availability import DaySchedule
+from restaurant.waitlist import waiting_candidates
+from restaurant.models import Table, Booking, WaitlistEntry
+from restaurant.tests.utils import QueryPlanAssertionsMixin, analyze
+
+
+class BookingQueryPlanTests(QueryPlanAssertionsMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(8)
+        today = timezone.now().date()
+        cls.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        cls.customer = get_user_model().objects.create_user(username="customer", password="testpassword")
+        users = get_user_model().objects.bulk_create([
+            get_user_model()(username=f"user{i}") for i in range(200)
+        ])
+        tables = Table.objects.bulk_create([Table(number=i, capacity=rng.choice([2, 4, 6])) for i in range(1, 41)])
+        cls.table = tables[0]
+        Booking.objects.bulk_create([
+            Booking(
+                user=rng.choice(users),
+                table=rng.choice(tables),
+                date=today + timedelta(days=rng.randint(-300, 60)),
+                time=time(rng.randint(11, 21), rng.choice([0, 15, 30, 45])),
+                status=rng.choice(['PENDING', 'CONFIRMED', 'CANCELLED'])
+            )
+            for i in range(20000)
+        ], batch_size=2000)
+        Booking.objects.create(user=cls.customer, table=cls.table, date=today, time=time(19, 0))
+        WaitlistEntry.objects.bulk_create([
+            WaitlistEntry(
+                user=rng.choice(users),
+                date=today + timedelta(days=rng.randint(-300, 60)),
+                time=time(rng.randint(11, 21), rng.choice([0, 15, 30, 45])),
+                number_of_guests=rng.randint(1, 8),
+                status=rng.choice(['WAITING', 'PROMOTED', 'CANCELLED']),
+            )
+            for i in range(5000)
+        ])
+        analyze()
+
+    def test_availability_check(self):
+        today = timezone.now().date()
+        self.assertIndexScans('restaurant_booking', DaySchedule.for_date, today)
+        self.assertIndexScans('restaurant_booking', DaySchedule.for_date, today, tables=[self.table])
+
+    def test_waitlist_candidates(self):
+        today = timezone.now().date()
+        self.assertIndexScans('restaurant_waitlistentry', list, waiting_candidates(today, time(19, 0), 90, 4)[:20])
+
+    def test_booking_list(self):
+        self.client.login(username="customer", password="testpassword")
+        self.assertIndexScans('restaurant_booking', self.client.get, reverse('booking_list'))
+
+    def test_admin_bookings_deep_page(self):
+        self.client.login(username="admin", password="adminpassword")
+        page = self.assertIndexScans('restaurant_booking', self.client.get, reverse('admin_bookings'), {'last': '1'})
+        cursor = page.context['bookings'].previous_cursor
+        self.assertIndexScans('restaurant_booking', self.client.get, reverse('admin_bookings'), {'before': cursor})
+
+    def test_admin_dashboard(self):
+        self.client.login(username="admin", password="adminpassword")
+        self.assertIndexScans('restaurant_booking', self.client.get, reverse('admin_dashboard'))
+
+    def test_admin_table_detail(self):
+        self.client.login(username="admin", password="adminpassword")
+        self.assertIndexScans('restaurant_booking', self.client.get, reverse('admin_table_detail', args=[self.table.id]))
+
+    def test_admin_customer_detail(self):
+        self.client.login(username="admin", password="adminpassword")
+        self.assertIndexScans('restaurant_booking', self.client.get, reverse('admin_customer_detail', args=[self.customer.id]))
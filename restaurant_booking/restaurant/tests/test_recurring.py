@@ -0,0 +1,111 @@
+from datetime import date, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from restaurant.models import Table, Booking, Task
+from restaurant.recurring import create_series, series_dates
+from restaurant.tests.utils import BookingStatsAssertionsMixin
+
+
+class SeriesDatesTest(TestCase):
+    def test_weekly_until_end_date(self):
+        self.assertEqual(
+            series_dates(date(2030, 1, 1), date(2030, 1, 29), 2),
+            [date(2030, 1, 1), date(2030, 1, 15), date(2030, 1, 29)],
+        )
+
+    def test_no_repeat_is_one_date(self):
+        self.assertEqual(series_dates(date(2030, 1, 1), date(2030, 6, 1)), [date(2030, 1, 1)])
+
+
+class CreateSeriesTest(BookingStatsAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=12, capacity=4)
+        self.other = Table.objects.create(number=13, capacity=6)
+        self.dates = series_dates(date(2030, 1, 1), date(2030, 6, 25), 1)
+
+    def test_conflicts_create_nothing(self):
+        taken = Booking.objects.create(user=self.user, table=self.table, date=date(2030, 2, 5), time=time(18, 30))
+
+        created, conflicts = create_series(self.user, [self.table], self.dates, time(19, 0), 2)
+
+        self.assertEqual(created, [])
+        self.assertEqual([(booking.date, booking.table) for booking, reason in conflicts], [(date(2030, 2, 5), self.table)])
+        self.assertEqual(list(Booking.objects.values_list('pk', flat=True)), [taken.pk])
+
+    def test_skip_conflicts_books_the_other_dates(self):
+        Booking.objects.create(user=self.user, table=self.table, date=date(2030, 2, 5), time=time(18, 30))
+        Task.objects.all().delete()
+
+        created, conflicts = create_series(self.user, [self.table], self.dates, time(19, 0), 2, skip_conflicts=True)
+
+        self.assertEqual(len(created), len(self.dates) - 1)
+        self.assertEqual(len(conflicts), 1)
+        self.assertFalse(Booking.objects.filter(date=date(2030, 2, 5), time=time(19, 0)).exists())
+        self.assertEqual(Task.objects.count(), len(created))
+        self.assertStatsConsistent()
+
+    def test_block_booking_checks_each_table(self):
+        created, conflicts = create_series(self.user, [self.table, self.other], [date(2030, 1, 1)], time(19, 0), 5)
+
+        self.assertEqual(created, [])
+        self.assertEqual([booking.table for booking, reason in conflicts], [self.table])
+        self.assertIn("capacity", conflicts[0][1])
+
+        created, conflicts = create_series(self.user, [self.table, self.other], [date(2030, 1, 1)], time(19, 0), 4)
+        self.assertEqual(sorted(booking.table.number for booking in created), [12, 13])
+
+    def test_query_count_does_not_grow_with_the_series(self):
+        def count(dates):
+            with CaptureQueriesContext(connection) as queries:
+                create_series(self.user, [self.table], dates, time(19, 0), 2)
+            return len(queries)
+
+        self.assertEqual(count(self.dates), count([date(2031, 1, 7), date(2031, 1, 14)]))
+
+
+class AdminBookingSeriesViewTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.client.login(username="admin", password="adminpassword")
+        self.start = timezone.now().date() + timedelta(days=1)
+
+    def post(self, **data):
+        return self.client.post(reverse('admin_booking_series'), {
+            'user': self.admin.id,
+            'tables': [self.table.id],
+            'start_date': self.start.isoformat(),
+            'time': '19:00',
+            'duration': 90,
+            'number_of_guests': 2,
+            'repeat': '1',
+            'until': (self.start + timedelta(weeks=3)).isoformat(),
+            'status': 'CONFIRMED',
+            **data,
+        })
+
+    def test_creates_weekly_series(self):
+        response = self.post()
+        self.assertRedirects(response, reverse('admin_customer_detail', args=[self.admin.id]))
+        self.assertEqual(
+            list(Booking.objects.order_by('date').values_list('date', flat=True)),
+            [self.start + timedelta(weeks=week) for week in range(4)],
+        )
+
+    def test_conflicts_are_listed(self):
+        Booking.objects.create(user=self.admin, table=self.table, date=self.start + timedelta(weeks=2), time=time(19, 0))
+        response = self.post()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([booking.date for booking, reason in response.context['conflicts']], [self.start + timedelta(weeks=2)])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_repeat_needs_an_end_date(self):
+        response = self.post(until='')
+        self.assertFalse(response.context['form'].is_valid())
+        self.assertEqual(Booking.objects.count(), 0)
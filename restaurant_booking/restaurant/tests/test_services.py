@@ -0,0 +1,139 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from restaurant.models import Table, Booking, Task, WaitlistEntry
+from restaurant.services import save_booking, bulk_set_status, bulk_delete
+from restaurant.tests.utils import BookingStatsAssertionsMixin
+
+
+class SaveBookingTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+
+    def test_second_booking_for_slot_is_rejected(self):
+        save_booking(Booking(user=self.user, table=self.table, date=date(2030, 1, 1), time=time(19, 0)))
+        with self.assertRaises(ValidationError):
+            save_booking(Booking(user=self.user, table=self.table, date=date(2030, 1, 1), time=time(19, 30)))
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_auto_assign_moves_to_next_free_table(self):
+        other = Table.objects.create(number=2, capacity=6)
+        first = save_booking(Booking(user=self.user, date=date(2030, 1, 1), time=time(19, 0), number_of_guests=2), auto_assign=True)
+        second = save_booking(Booking(user=self.user, date=date(2030, 1, 1), time=time(19, 0), number_of_guests=2), auto_assign=True)
+        self.assertEqual(first.table, self.table)
+        self.assertEqual(second.table, other)
+
+        with self.assertRaises(ValidationError):
+            save_booking(Booking(user=self.user, date=date(2030, 1, 1), time=time(19, 0), number_of_guests=2), auto_assign=True)
+
+
+class BulkBookingActionsTest(BookingStatsAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.other = Table.objects.create(number=2, capacity=4)
+
+    def book(self, at, table=None, status='PENDING', guests=2):
+        return Booking.objects.create(
+            user=self.user, table=table or self.table, date=date(2030, 1, 1), time=at, status=status, number_of_guests=guests
+        )
+
+    def test_cancel_updates_statuses_stats_and_tasks(self):
+        first = self.book(time(12, 0))
+        second = self.book(time(19, 0), status='CONFIRMED')
+        cancelled = self.book(time(21, 0), status='CANCELLED')
+        Task.objects.all().delete()
+
+        changed, conflicts = bulk_set_status(Booking.objects.all(), 'CANCELLED')
+
+        self.assertEqual(sorted(row['pk'] for row in changed), [first.pk, second.pk])
+        self.assertEqual(conflicts, [])
+        self.assertEqual(Booking.objects.filter(status='CANCELLED').count(), 3)
+        self.assertStatsConsistent()
+        self.assertEqual(
+            set(Task.objects.values_list('dedup_key', flat=True)),
+            {
+                f'booking-email:{first.pk}:cancelled',
+                f'booking-email:{second.pk}:cancelled',
+                f'waitlist:{self.table.pk}:2030-01-01:12:00:00',
+                f'waitlist:{self.table.pk}:2030-01-01:19:00:00',
+            },
+        )
+        self.assertFalse(Task.objects.filter(kwargs__booking_id=cancelled.pk).exists())
+
+    def test_reactivation_skips_bookings_whose_table_is_taken(self):
+        taken = self.book(time(19, 0), status='CANCELLED')
+        self.book(time(19, 30))
+        earlier = self.book(time(12, 0), status='CANCELLED')
+        clashing = self.book(time(12, 30), status='CANCELLED')
+        elsewhere = self.book(time(12, 0), table=self.other, status='CANCELLED')
+        too_big = self.book(time(15, 0), status='CANCELLED', guests=6)
+
+        changed, conflicts = bulk_set_status(Booking.objects.filter(status='CANCELLED'), 'CONFIRMED')
+
+        self.assertEqual(sorted(row['pk'] for row in changed), sorted([earlier.pk, elsewhere.pk]))
+        self.assertEqual(sorted(row['pk'] for row in conflicts), sorted([taken.pk, clashing.pk, too_big.pk]))
+        for booking in (taken, clashing, too_big):
+            booking.refresh_from_db()
+            self.assertEqual(booking.status, 'CANCELLED')
+        self.assertStatsConsistent()
+
+    def test_query_count_does_not_grow_with_the_selection(self):
+        def count(bookings):
+            with CaptureQueriesContext(connection) as queries:
+                bulk_set_status(Booking.objects.filter(pk__in=[booking.pk for booking in bookings]), 'CONFIRMED')
+            return len(queries)
+
+        few = [self.book(time(hour, 0)) for hour in (11, 12)]
+        many = [self.book(time(hour, minute), table=self.other) for hour in range(11, 20) for minute in (0, 30)]
+        self.assertEqual(count(many), count(few))
+
+    def test_delete_keeps_stats_and_waitlist_links(self):
+        kept = self.book(time(12, 0))
+        gone = [self.book(time(hour, 0)) for hour in (14, 18, 21)]
+        entry = WaitlistEntry.objects.create(
+            user=self.user, date=date(2030, 1, 1), time=time(18, 0), status=WaitlistEntry.PROMOTED, booking=gone[1]
+        )
+
+        self.assertEqual(bulk_delete(Booking.objects.exclude(pk=kept.pk)), 3)
+
+        self.assertEqual(list(Booking.objects.values_list('pk', flat=True)), [kept.pk])
+        entry.refresh_from_db()
+        self.assertIsNone(entry.booking)
+        self.assertStatsConsistent()
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentBookingTest(TransactionTestCase):
+    ATTEMPTS = 100
+    # Stay below PostgreSQL's default max_connections of 100.
+    WORKERS = 25
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+
+    def attempt(self, barrier):
+        try:
+            barrier.wait()
+            save_booking(Booking(user=self.user, table=self.table, date=date(2030, 1, 1), time=time(19, 0)))
+            return True
+        except ValidationError:
+            return False
+        finally:
+            connection.close()
+
+    def test_parallel_bookings_for_one_slot(self):
+        barrier = threading.Barrier(self.WORKERS)
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as executor:
+            results = list(executor.map(lambda i: self.attempt(barrier), range(self.ATTEMPTS)))
+
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Booking.objects.filter(table=self.table).count(), 1)
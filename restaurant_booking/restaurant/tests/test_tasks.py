@@ -0,0 +1,118 @@
+from datetime import timedelta, time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from restaurant.models import Table, Booking, Task
+from restaurant.tasks import enqueue, run_pending, task, requeue_stale, purge_finished
+
+calls = []
+
+
+@task(max_attempts=2)
+def record_call(value):
+    calls.append(value)
+    if value == 'fail':
+        raise RuntimeError("failed")
+
+
+class TaskQueueTest(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_run_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            queued = enqueue(record_call, value='a')
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(run_pending(), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.DONE, 1))
+        self.assertEqual(calls, ['a'])
+        self.assertEqual(run_pending(), 0)
+
+    def test_dedup_key(self):
+        self.assertIsNotNone(enqueue(record_call, dedup_key='key', value='a'))
+        self.assertIsNone(enqueue(record_call, dedup_key='key', value='b'))
+        run_pending()
+        self.assertIsNotNone(enqueue(record_call, dedup_key='key', value='c'))
+        run_pending()
+        self.assertEqual(calls, ['a', 'c'])
+
+    @override_settings(TASK_RETRY_DELAY=60)
+    def test_retries_then_fails(self):
+        queued = enqueue(record_call, value='fail')
+        with self.assertLogs('restaurant.tasks', 'ERROR'):
+            run_pending()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.QUEUED, 1))
+        self.assertGreater(queued.run_after, timezone.now() + timedelta(seconds=50))
+        self.assertIn("RuntimeError: failed", queued.last_error)
+        self.assertEqual(run_pending(), 0)
+
+        Task.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        with self.assertLogs('restaurant.tasks', 'ERROR'):
+            run_pending()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+        self.assertEqual(calls, ['fail', 'fail'])
+
+    @override_settings(TASK_TIMEOUT=60)
+    def test_stale_tasks_are_requeued(self):
+        queued = enqueue(record_call, value='a')
+        Task.objects.filter(pk=queued.pk).update(status=Task.RUNNING, started_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(run_pending(), 0)
+        self.assertEqual(requeue_stale(), 1)
+        self.assertEqual(run_pending(), 1)
+
+    @override_settings(TASK_TIMEOUT=60)
+    def test_task_finished_meanwhile_is_not_requeued(self):
+        queued = enqueue(record_call, value='a')
+        Task.objects.filter(pk=queued.pk).update(status=Task.RUNNING, started_at=timezone.now() - timedelta(minutes=5))
+        atomic = transaction.atomic
+
+        def finish_first(*args, **kwargs):
+            # The worker finishes between requeue_stale's read and its update.
+            Task.objects.filter(pk=queued.pk).update(status=Task.DONE)
+            return atomic(*args, **kwargs)
+
+        with mock.patch.object(transaction, 'atomic', finish_first):
+            self.assertEqual(requeue_stale(), 0)
+        self.assertEqual(Task.objects.get(pk=queued.pk).status, Task.DONE)
+
+    def test_purge_finished(self):
+        now = timezone.now()
+        old_done, old_failed, recent, queued = [enqueue(record_call, value=str(i)) for i in range(4)]
+        Task.objects.filter(pk__in=[old_done.pk, old_failed.pk]).update(finished_at=now - timedelta(days=10))
+        Task.objects.filter(pk=old_done.pk).update(status=Task.DONE)
+        Task.objects.filter(pk=old_failed.pk).update(status=Task.FAILED)
+        Task.objects.filter(pk=recent.pk).update(status=Task.DONE, finished_at=now)
+
+        self.assertEqual(purge_finished(now - timedelta(days=7), batch_size=1), 2)
+        self.assertEqual(sorted(Task.objects.values_list('pk', flat=True)), sorted([recent.pk, queued.pk]))
+
+
+class BookingTaskTest(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.user = get_user_model().objects.create_user(username="testuser", email="test@example.com")
+        self.table = Table.objects.create(number=1, capacity=4)
+
+    def test_booking_emails(self):
+        booking = Booking.objects.create(
+            user=self.user, table=self.table, date=timezone.now().date() + timedelta(days=1), time=time(19, 0)
+        )
+        self.client.login(username="admin", password="adminpassword")
+        self.client.get(reverse('admin_booking_confirm', args=[booking.id]))
+        self.client.get(reverse('admin_booking_confirm', args=[booking.id]))
+        self.assertEqual(len(mail.outbox), 0)
+
+        self.assertEqual(run_pending(), 2)
+        self.assertEqual([message.subject for message in mail.outbox], [
+            "We've received your booking", "Your booking is confirmed",
+        ])
+        self.assertEqual(mail.outbox[1].to, ["test@example.com"])
+        self.assertIn("Table:  1", mail.outbox[1].body)
@@ -1,8 +1,24 @@
-from django.test import TestCase
+from django.test import TestCase, RequestFactory, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from restaurant.models import Table, Menu, Booking
 from django.utils import timezone
+from django.db import connection
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test.utils import CaptureQueriesContext
+from django.http import HttpResponse
+from restaurant.middleware import RepeatedQueryMiddleware, query_shape
+from restaurant.metrics import registry
+from restaurant.tests.utils import RepeatedQueryAssertionsMixin
+from datetime import timedelta, time
+import csv
+import io
+import os
+import tempfile
+import threading
+import zipfile
+from unittest import mock
 
 
 class BookingViewTests(TestCase):
@@ -79,3 +95,549 @@ class BookingViewTests(TestCase):
         booking.refresh_from_db()
         self.assertEqual(booking.status, 'CANCELLED')
         self.assertRedirects(response, reverse('booking_list'))
+
+
+class BookingAutoAssignViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.client.login(username="testuser", password="testpassword")
+
+    def test_booking_form_has_no_table_field(self):
+        response = self.client.get(reverse('booking'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('table', response.context['form'].fields)
+
+    def test_booking_form_shows_availability_grid(self):
+        date = timezone.now().date() + timedelta(days=1)
+        Booking.objects.create(user=self.user, table=self.table, date=date, time=time(19, 0))
+        response = self.client.get(reverse('booking'), {'date': date.isoformat()})
+        grid = response.context['grid']
+        self.assertEqual(grid.date, date)
+        self.assertFalse(grid.is_free(self.table.pk, time(19, 0)))
+        self.assertContains(response, 'data-time="19:00"')
+
+    def test_booking_is_assigned_a_table(self):
+        response = self.client.post(reverse('booking'), {
+            'date': timezone.now().date() + timedelta(days=1),
+            'time': '19:00',
+            'number_of_guests': 3
+        })
+        booking = Booking.objects.get()
+        self.assertRedirects(response, reverse('booking_detail', args=[booking.id]))
+        self.assertEqual(booking.table, self.table)
+        self.assertEqual(booking.user, self.user)
+
+
+class AdminDashboardViewTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.client.login(username="admin", password="adminpassword")
+
+    def dashboard_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_dashboard_chart_data(self):
+        today = timezone.now().date()
+        for days_ago, guests in [(0, 2), (0, 3), (3, 2), (20, 4)]:
+            Booking.objects.create(
+                user=self.admin,
+                table=self.table,
+                date=today - timedelta(days=days_ago),
+                number_of_guests=guests
+            )
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(len(response.context['week_data']), 7)
+        self.assertEqual(len(response.context['month_data']), 30)
+        self.assertEqual(response.context['week_data'][-1], 2)
+        self.assertEqual(response.context['week_data'][-4], 1)
+        self.assertEqual(response.context['month_data'][-21], 1)
+        self.assertEqual(sum(response.context['week_data']), 3)
+        self.assertEqual(sum(response.context['month_data']), 4)
+
+    def test_dashboard_query_count_is_constant(self):
+        # The first request caches the logged-in user.
+        self.dashboard_query_count()
+        empty_count = self.dashboard_query_count()
+        today = timezone.now().date()
+        for days_ago in range(30):
+            Booking.objects.create(user=self.admin, table=self.table, date=today - timedelta(days=days_ago))
+        self.assertEqual(self.dashboard_query_count(), empty_count)
+
+
+class AdminBookingsBulkViewTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.client.login(username="admin", password="adminpassword")
+        self.date = timezone.now().date() + timedelta(days=1)
+        self.bookings = [
+            Booking.objects.create(user=self.admin, table=self.table, date=self.date, time=time(hour, 0))
+            for hour in (12, 15, 18)
+        ]
+
+    def test_confirm_selected(self):
+        response = self.client.post(reverse('admin_bookings_bulk'), {
+            'action': 'confirm',
+            'selected': [self.bookings[0].id, self.bookings[2].id],
+        })
+        self.assertRedirects(response, reverse('admin_bookings'))
+        self.assertEqual(
+            list(Booking.objects.order_by('time').values_list('status', flat=True)),
+            ['CONFIRMED', 'PENDING', 'CONFIRMED'],
+        )
+
+    def test_cancel_matching_filter(self):
+        Booking.objects.create(user=self.admin, table=self.table, date=self.date + timedelta(days=1))
+        response = self.client.post(reverse('admin_bookings_bulk'), {
+            'action': 'cancel', 'scope': 'filter', 'date': self.date.isoformat(),
+        })
+        self.assertRedirects(response, f"{reverse('admin_bookings')}?date={self.date.isoformat()}")
+        self.assertEqual(Booking.objects.filter(status='CANCELLED').count(), 3)
+        self.assertEqual(Booking.objects.filter(status='PENDING').count(), 1)
+
+    def test_filter_scope_needs_a_filter(self):
+        self.client.post(reverse('admin_bookings_bulk'), {'action': 'delete', 'scope': 'filter'})
+        self.client.post(reverse('admin_bookings_bulk'), {'action': 'delete', 'scope': 'filter', 'date': 'tomorrow'})
+        self.assertEqual(Booking.objects.count(), 3)
+
+    def test_delete_selected(self):
+        self.client.post(reverse('admin_bookings_bulk'), {'action': 'delete', 'selected': [self.bookings[1].id]})
+        self.assertEqual(Booking.objects.count(), 2)
+        self.assertEqual(self.client.get(reverse('admin_bookings_bulk')).status_code, 405)
+
+
+class AdminCustomersViewTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.client.login(username="admin", password="adminpassword")
+
+    def customers_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_customers'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_customer_booking_annotations(self):
+        customer = get_user_model().objects.create_user(username="customer", password="testpassword")
+        today = timezone.now().date()
+        Booking.objects.create(user=customer, table=self.table, date=today - timedelta(days=3))
+        latest = Booking.objects.create(user=customer, table=self.table, date=today + timedelta(days=2))
+        response = self.client.get(reverse('admin_customers'), {'search': 'custom'})
+        customers = list(response.context['customers'])
+        self.assertEqual(len(customers), 1)
+        self.assertEqual(customers[0].bookings_count, 2)
+        self.assertEqual(customers[0].last_booking_date, latest.date)
+        self.assertEqual(customers[0].last_booking_id, latest.id)
+
+    def test_customers_query_count_is_constant(self):
+        # The first request caches the logged-in user.
+        self.customers_query_count()
+        empty_count = self.customers_query_count()
+        today = timezone.now().date()
+        for i in range(10):
+            customer = get_user_model().objects.create_user(username=f"customer{i}", password="testpassword")
+            Booking.objects.create(user=customer, table=self.table, date=today + timedelta(days=i))
+        self.assertEqual(self.customers_query_count(), empty_count)
+
+    def test_estimated_count_is_optional(self):
+        self.customers_query_count()
+        with CaptureQueriesContext(connection) as queries:
+            self.assertIsNone(self.client.get(reverse('admin_customers')).context['customers'].estimated_count)
+        self.assertFalse([query for query in queries if query['sql'].startswith('EXPLAIN')])
+
+        with self.settings(ADMIN_ESTIMATED_COUNTS=True):
+            estimated_count = self.client.get(reverse('admin_customers')).context['customers'].estimated_count
+        if connection.vendor == 'postgresql':
+            self.assertIsNotNone(estimated_count)
+
+
+class AdminCustomerStatsTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.customer = get_user_model().objects.create_user(username="customer", password="customerpassword")
+        self.table = Table.objects.create(number=1, capacity=8)
+        self.other = Table.objects.create(number=2, capacity=8)
+        self.client.login(username="admin", password="adminpassword")
+        today = timezone.now().date()
+        for days, table, guests, status in [
+            (-10, self.table, 2, 'CONFIRMED'),
+            (-5, self.other, 4, 'CONFIRMED'),
+            (-3, self.other, 6, 'CANCELLED'),
+            (2, self.other, 4, 'PENDING'),
+        ]:
+            self.booking = Booking.objects.create(
+                user=self.customer, table=table, date=today + timedelta(days=days), number_of_guests=guests, status=status
+            )
+        self.today = today
+
+    def test_customer_detail_stats(self):
+        response = self.client.get(reverse('admin_customer_detail', args=[self.customer.id]))
+        context = response.context
+        self.assertEqual(
+            (context['bookings_count'], context['upcoming_bookings'], context['completed_bookings'], context['cancelled_bookings']),
+            (4, 1, 3, 1),
+        )
+        self.assertEqual((context['visits'], context['last_visit']), (2, self.today - timedelta(days=5)))
+        self.assertEqual((context['total_guests'], context['avg_party_size']), (16, 4))
+        self.assertEqual(context['favorite_table'], 2)
+
+    def test_booking_detail_stats(self):
+        response = self.client.get(reverse('admin_booking_detail', args=[self.booking.id]))
+        self.assertEqual(
+            (response.context['customer_booking_count'], response.context['customer_visits'], response.context['avg_party_size']),
+            (4, 2, 4),
+        )
+
+    def test_stats_query_count_is_constant(self):
+        def count():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('admin_customer_detail', args=[self.customer.id]))
+            return len(queries)
+
+        # Warm the user cache, in case it is on.
+        count()
+        with_bookings = count()
+        # Session, admin user, customer, the UNION ALL figures, the
+        # favourite-table UNION and the latest live and archived bookings.
+        self.assertLessEqual(with_bookings, 7)
+        Booking.objects.filter(user=self.customer).delete()
+        self.assertEqual(with_bookings, count())
+
+
+class AdminReportsViewTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.table = Table.objects.create(number=1, capacity=8)
+        self.client.login(username="admin", password="adminpassword")
+
+    def test_bookings_report(self):
+        today = timezone.now().date()
+        Booking.objects.create(user=self.admin, table=self.table, date=today, time=time(19, 0), number_of_guests=2)
+        Booking.objects.create(user=self.admin, table=self.table, date=today, time=time(12, 0), number_of_guests=4, status='CONFIRMED')
+        Booking.objects.create(user=self.admin, table=self.table, date=today - timedelta(days=2), time=time(19, 30), number_of_guests=3, status='CANCELLED')
+        Booking.objects.create(user=self.admin, table=self.table, date=today - timedelta(days=60), number_of_guests=5)
+
+        response = self.client.get(reverse('admin_reports'), {'type': 'bookings', 'period': 'week'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_bookings'], 3)
+        self.assertEqual(response.context['total_guests'], 9)
+        self.assertEqual(response.context['status_counts'], {'PENDING': 1, 'CONFIRMED': 1, 'CANCELLED': 1})
+        self.assertEqual(response.context['popular_hours'], {'7 PM': 2, '12 PM': 1})
+        self.assertEqual(response.context['chart_data'][-1], 2)
+        self.assertEqual(sum(response.context['chart_data']), 3)
+
+    def test_bookings_report_query_count_is_constant(self):
+        def report_query_count():
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('admin_reports'), {'type': 'bookings', 'period': 'year'})
+            return len(queries)
+
+        # The first request caches the logged-in user.
+        report_query_count()
+        empty_count = report_query_count()
+        today = timezone.now().date()
+        for days_ago in range(40):
+            Booking.objects.create(user=self.admin, table=self.table, date=today - timedelta(days=days_ago))
+        self.assertEqual(report_query_count(), empty_count)
+
+    def test_customers_report(self):
+        response = self.client.get(reverse('admin_reports'), {'type': 'customers', 'period': 'month'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['new_customers'], 1)
+        self.assertEqual(response.context['chart_data'][-1], 1)
+
+
+class AdminExportViewTests(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.today = timezone.now().date()
+        Booking.objects.create(user=self.admin, table=self.table, date=self.today, time=time(19, 0), special_requests="=1+1")
+        Booking.objects.create(user=self.admin, table=self.table, date=self.today, time=time(12, 0), status='CANCELLED')
+        self.client.login(username="admin", password="adminpassword")
+
+    def test_bookings_csv_follows_filters(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin_bookings'), {'status': 'PENDING', 'export': 'csv'})
+            rows = list(csv.reader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual(len([query for query in queries if 'restaurant_booking' in query['sql']]), 1)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][4:10], ['admin', '', '1', '1', 'Pending', "'=1+1"])
+
+    def test_report_xlsx(self):
+        response = self.client.get(reverse('admin_reports'), {'type': 'bookings', 'period': 'week', 'export': 'xlsx'})
+        workbook = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 3)
+        self.assertIn('<t xml:space="preserve">Cancelled</t>', sheet)
+
+    def test_customers_report_csv(self):
+        response = self.client.get(reverse('admin_reports'), {'type': 'customers', 'period': 'week', 'export': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'ID,Username,Email,First Name,Last Name,Joined,Role')
+        self.assertIn(',admin,', lines[1])
+
+
+class AdminImportViewTests(TestCase):
+    def setUp(self):
+        get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.client.login(username="admin", password="adminpassword")
+
+    def test_upload_tables(self):
+        upload = SimpleUploadedFile('tables.csv', b'number,capacity\n1,4\n2,six\n3,2\n')
+        response = self.client.post(reverse('admin_import'), {'kind': 'tables', 'file': upload})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(Table.objects.order_by('number').values_list('number', flat=True)), [1, 3])
+        importer = response.context['importer']
+        self.assertEqual((importer.rows, importer.created, importer.error_count), (3, 2, 1))
+        self.assertContains(response, 'capacity:')
+
+
+class MenuViewCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.menu_item = Menu.objects.create(
+            name="Grilled Salmon",
+            description="A delicious grilled salmon",
+            price=15.99,
+            category="MAIN",
+            is_available=True
+        )
+
+    def test_menu_is_served_from_cache(self):
+        response = self.client.get(reverse('menu'))
+        self.assertContains(response, "Grilled Salmon")
+        # Only the version aggregate; the items come from the fragment.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('menu'))
+        self.assertContains(response, "Grilled Salmon")
+
+    def test_version_comes_from_the_database(self):
+        self.client.get(reverse('menu'))
+        # Another worker's change: nothing in this process's cache is
+        # cleared, and bulk updates send no signals at all.
+        Menu.objects.filter(pk=self.menu_item.pk).update(name="Seared Salmon", updated_at=timezone.now())
+        self.assertContains(self.client.get(reverse('menu')), "Seared Salmon")
+
+    def test_menu_change_invalidates_cache(self):
+        self.client.get(reverse('menu'))
+        self.menu_item.name = "Seared Salmon"
+        self.menu_item.save()
+        self.assertContains(self.client.get(reverse('menu')), "Seared Salmon")
+
+        self.menu_item.delete()
+        self.assertNotContains(self.client.get(reverse('menu')), "Seared Salmon")
+
+    def test_conditional_requests(self):
+        response = self.client.get(reverse('menu'))
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+
+        self.assertEqual(self.client.get(reverse('menu'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(reverse('menu'), HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+        Menu.objects.create(name="Soup", description="Hot", price=5, category="SOUP")
+        self.assertEqual(self.client.get(reverse('menu'), HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_deletion_moves_last_modified(self):
+        other = Menu.objects.create(name="Soup", description="Hot", price=5, category="SOUP")
+        Menu.objects.filter(pk__in=[self.menu_item.pk, other.pk]).update(updated_at=timezone.now() - timedelta(days=1))
+        last_modified = self.client.get(reverse('menu'))['Last-Modified']
+
+        other.delete()
+        self.assertEqual(self.client.get(reverse('menu'), HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_bulk_delete_stamps_the_menu_once(self):
+        for name in ["Soup", "Salad", "Cake"]:
+            Menu.objects.create(name=name, description="", price=5, category="SOUP")
+        with CaptureQueriesContext(connection) as queries:
+            Menu.objects.exclude(pk=self.menu_item.pk).delete()
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+
+    def test_pending_messages_skip_conditional_response(self):
+        user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        etag = self.client.get(reverse('menu'))['ETag']
+
+        # Cancelling leaves a flash message for the next page, which a 304
+        # would replace with the browser's copy.
+        booking = Booking.objects.create(user=user, table=Table.objects.create(number=1, capacity=4), date=timezone.now().date() + timedelta(days=1))
+        self.client.post(reverse('booking_cancel', args=[booking.id]))
+        response = self.client.get(reverse('menu'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(self.client.get(reverse('menu'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class BookingListQueryTests(RepeatedQueryAssertionsMixin, TestCase):
+    def setUp(self):
+        today = timezone.now().date()
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.customer = get_user_model().objects.create_user(username="customer", password="testpassword")
+        users = [get_user_model().objects.create_user(username=f"user{i}") for i in range(5)] + [self.customer] * 3
+        for i, user in enumerate(users):
+            table = Table.objects.create(number=i + 1, capacity=4)
+            Booking.objects.create(user=user, table=table, date=today + timedelta(days=i % 2), time=time(12 + i, 0))
+        self.booking = Booking.objects.filter(user=self.customer).first()
+
+    def test_customer_booking_list(self):
+        self.client.login(username="customer", password="testpassword")
+        response = self.assertNoRepeatedQueries(self.client.get, reverse('booking_list'))
+        self.assertEqual(len(response.context['bookings']), 3)
+
+    def test_admin_lists(self):
+        self.client.login(username="admin", password="adminpassword")
+        for url in (
+            reverse('admin_dashboard'),
+            reverse('admin_bookings'),
+            reverse('admin_booking_detail', args=[self.booking.id]),
+            reverse('admin_customer_detail', args=[self.customer.id]),
+            reverse('admin_table_detail', args=[self.booking.table_id]),
+        ):
+            with self.subTest(url=url):
+                response = self.assertNoRepeatedQueries(self.client.get, url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_middleware_logs_repeated_queries(self):
+        def view(request):
+            for booking in Booking.objects.all():
+                booking.user.username
+            return HttpResponse()
+
+        with override_settings(DEBUG=True, N_PLUS_ONE_THRESHOLD=5):
+            middleware = RepeatedQueryMiddleware(view)
+        with self.assertLogs('restaurant.middleware', 'WARNING') as logs:
+            middleware(RequestFactory().get('/bookings/'))
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('8 times', logs.output[0])
+
+    def test_query_shape(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE a = 1 AND b = 'x''y' AND c IN (1, 2, 3)"),
+            query_shape("SELECT * FROM t WHERE a = 22 AND b = 'z' AND c IN (4)"),
+        )
+
+
+class AdminMetricsViewTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.customer = get_user_model().objects.create_user(username="customer", password="testpassword")
+
+    def test_metrics_by_view(self):
+        self.client.login(username="customer", password="testpassword")
+        self.client.get(reverse('booking_list'))
+        self.client.get(reverse('booking_list'))
+        self.client.get('/no-such-page/')
+        self.assertNotEqual(self.client.get(reverse('admin_metrics')).status_code, 200)
+
+        self.client.login(username="admin", password="adminpassword")
+        response = self.client.get(reverse('admin_metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        metrics = response.content.decode()
+        self.assertIn('restaurant_request_duration_seconds_count{view="booking_list"} 2', metrics)
+        self.assertIn('restaurant_requests_total{view="booking_list",status="200"} 2', metrics)
+        self.assertIn('restaurant_requests_total{view="<unresolved>",status="404"} 1', metrics)
+        self.assertIn('restaurant_request_db_queries_bucket{view="booking_list",le="+Inf"} 2', metrics)
+        self.assertRegex(metrics, r'restaurant_template_render_seconds_total\{view="booking_list"\} 0\.\d+')
+        self.assertRegex(metrics, r'restaurant_db_time_seconds_total\{view="booking_list"\} 0\.\d+')
+
+    async def test_async_views_run_without_the_sync_adapter(self):
+        table = await Table.objects.acreate(number=1, capacity=4)
+        await Booking.objects.acreate(user=self.customer, table=table, date=timezone.now().date(), time=time(19, 0))
+        threads = []
+        record = registry.record
+
+        def record_in_thread(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return record(*args, **kwargs)
+
+        with mock.patch.object(registry, 'record', record_in_thread):
+            response = await self.async_client.get(reverse('api_availability'), {'date': timezone.now().date().isoformat()})
+        self.assertEqual(response.status_code, 200)
+        # A sync-only middleware would be run by the sync adapter in another
+        # thread, and every view behind it too.
+        self.assertEqual(threads, [threading.current_thread()])
+
+        metrics = registry.views['api_availability']
+        self.assertEqual(metrics.responses, {200: 1})
+        self.assertGreater(metrics.queries.sum, 0)
+        self.assertGreater(metrics.db_time, 0)
+
+    def test_profiling_sample(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_PROFILE_RATE=1, METRICS_PROFILE_VIEWS=['admin_reports'], METRICS_PROFILE_DIR=directory):
+                self.client.login(username="admin", password="adminpassword")
+                self.client.get(reverse('admin_dashboard'))
+                self.client.get(reverse('admin_reports'))
+            profiles = os.listdir(directory)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith('admin_reports-'))
+
+
+# As deployed with a shared cache; under locmem the user cache is off.
+@override_settings(USER_CACHE_TIMEOUT=60)
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.booking = Booking.objects.create(
+            user=self.admin, table=self.table, date=timezone.now().date() + timedelta(days=1), time=time(19, 0)
+        )
+
+    def tables_queried(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'].split(' FROM ')[1].split()[0].strip('"') for query in captured if ' FROM ' in query['sql']]
+
+    def test_user_is_cached_between_requests(self):
+        self.client.login(username="admin", password="adminpassword")
+        url = reverse('booking_detail', args=[self.booking.id])
+        self.assertIn('restaurant_customuser', self.tables_queried(url))
+        self.assertNotIn('restaurant_customuser', self.tables_queried(url))
+        self.assertIn('django_session', self.tables_queried(url))
+
+    def test_role_change_applies_immediately(self):
+        self.client.login(username="admin", password="adminpassword")
+        self.assertEqual(self.client.get(reverse('admin_dashboard')).status_code, 200)
+        self.admin.role = 'customer'
+        self.admin.save()
+        self.assertNotEqual(self.client.get(reverse('admin_dashboard')).status_code, 200)
+
+    def test_deactivated_user_is_logged_out(self):
+        self.client.login(username="admin", password="adminpassword")
+        url = reverse('booking_detail', args=[self.booking.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.admin.is_active = False
+        self.admin.save()
+        self.assertRedirects(self.client.get(url), f"{reverse('login')}?next={url}")
+
+    @override_settings(USER_CACHE_TIMEOUT=0)
+    def test_deactivation_without_signals_applies_when_cache_is_off(self):
+        # update() clears no cache entry, which only the default of not
+        # caching users copes with.
+        self.client.login(username="admin", password="adminpassword")
+        url = reverse('booking_detail', args=[self.booking.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        get_user_model().objects.filter(pk=self.admin.pk).update(is_active=False)
+        self.assertRedirects(self.client.get(url), f"{reverse('login')}?next={url}")
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db')
+    def test_cached_db_sessions(self):
+        self.client.login(username="admin", password="adminpassword")
+        url = reverse('admin_booking_detail', args=[self.booking.id])
+        self.tables_queried(url)
+        tables = self.tables_queried(url)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('restaurant_customuser', tables)
@@ -0,0 +1,105 @@
+from datetime import time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from restaurant.models import Table, Booking, WaitlistEntry
+from restaurant.tasks import run_pending
+from restaurant.waitlist import promotion_window
+
+
+class WaitlistPromotionTest(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.table = Table.objects.create(number=1, capacity=4)
+        self.day = timezone.now().date() + timedelta(days=7)
+        self.booking = Booking.objects.create(
+            user=self.user, table=self.table, date=self.day, time=time(19, 0), number_of_guests=4
+        )
+
+    def wait(self, username, guests, at, day=None):
+        user = get_user_model().objects.create_user(username=username)
+        return WaitlistEntry.objects.create(user=user, date=day or self.day, time=at, number_of_guests=guests)
+
+    def cancel(self):
+        self.booking.status = 'CANCELLED'
+        self.booking.save()
+        run_pending()
+
+    def test_cancellation_promotes_best_fitting_party(self):
+        small = self.wait("small", 2, time(19, 0))
+        best = self.wait("best", 4, time(19, 30))
+        too_big = self.wait("too_big", 6, time(19, 0))
+        too_late = self.wait("too_late", 4, time(21, 0))
+        other_day = self.wait("other_day", 4, time(19, 0), day=self.day + timedelta(days=1))
+
+        self.cancel()
+
+        best.refresh_from_db()
+        self.assertEqual(best.status, WaitlistEntry.PROMOTED)
+        self.assertEqual(
+            (best.booking.table, best.booking.date, best.booking.time, best.booking.status, best.booking.user.username),
+            (self.table, self.day, time(19, 30), 'PENDING', 'best'),
+        )
+        # The small party's 19:00 seating overlaps the promoted 19:30 one.
+        for entry in (small, too_big, too_late, other_day):
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, WaitlistEntry.WAITING)
+
+    def test_parties_that_fit_around_other_bookings(self):
+        Booking.objects.create(user=self.user, table=self.table, date=self.day, time=time(20, 30))
+        blocked = self.wait("blocked", 4, time(19, 30))
+        first = self.wait("first", 2, time(18, 0))
+        second = self.wait("second", 2, time(18, 15))
+
+        self.cancel()
+
+        for entry, status in ((blocked, WaitlistEntry.WAITING), (first, WaitlistEntry.PROMOTED), (second, WaitlistEntry.WAITING)):
+            entry.refresh_from_db()
+            self.assertEqual(entry.status, status)
+
+    def test_only_cancellations_promote(self):
+        entry = self.wait("waiting", 2, time(19, 0))
+        self.booking.status = 'CONFIRMED'
+        self.booking.save()
+        Booking.objects.filter(pk=self.booking.pk).update(status='CANCELLED')
+        run_pending()
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistEntry.WAITING)
+
+    def test_promotion_window(self):
+        self.assertEqual(promotion_window(time(19, 0), 90), (time(17, 30), time(20, 30)))
+        self.assertEqual(promotion_window(time(0, 30), 90), (time.min, time(2, 0)))
+        self.assertEqual(promotion_window(time(23, 0), 90), (time(21, 30), time.max))
+
+
+class WaitlistViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="testuser", password="testpassword")
+        self.client.login(username="testuser", password="testpassword")
+        self.day = timezone.now().date() + timedelta(days=3)
+
+    def test_join_and_leave(self):
+        data = {'date': self.day, 'time': '19:00', 'number_of_guests': 2}
+        response = self.client.post(reverse('waitlist_join'), data)
+        self.assertRedirects(response, reverse('booking_list'))
+        entry = WaitlistEntry.objects.get(user=self.user)
+
+        response = self.client.post(reverse('waitlist_join'), data)
+        self.assertContains(response, "already on the waitlist")
+
+        response = self.client.get(reverse('booking_list'))
+        self.assertEqual(list(response.context['waitlist']), [entry])
+
+        self.client.post(reverse('waitlist_leave', args=[entry.id]))
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, WaitlistEntry.CANCELLED)
+
+    def test_admin_waitlist(self):
+        admin = get_user_model().objects.create_user(username="admin", password="adminpassword", role='admin')
+        WaitlistEntry.objects.create(user=self.user, date=self.day, time=time(19, 0), number_of_guests=2)
+        self.client.login(username="admin", password="adminpassword")
+        response = self.client.get(reverse('admin_waitlist'), {'date': self.day.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['entries']), 1)
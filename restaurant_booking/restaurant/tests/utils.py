@@ -0,0 +1,82 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from restaurant.analytics import rebuild_booking_stats
+from restaurant.middleware import repeated_queries
+from restaurant.models import DailyBookingStats
+
+
+SEQUENTIAL_SCAN_PATTERNS = {
+    'postgresql': r'Seq Scan on "?{table}"?\b',
+    'sqlite': r'\bSCAN "?{table}"?(?! USING)\b',
+}
+
+
+def explain(sql, params=()):
+    prefix = 'EXPLAIN' if connection.vendor == 'postgresql' else 'EXPLAIN QUERY PLAN'
+    with connection.cursor() as cursor:
+        cursor.execute(f'{prefix} {sql}', params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+class QueryPlanAssertionsMixin:
+    # Runs a callable, EXPLAINs every SELECT it issued against `table`
+    # and fails if the plan reads that table with a sequential scan.
+
+    def assertIndexScans(self, table, func, *args, **kwargs):
+        pattern = SEQUENTIAL_SCAN_PATTERNS[connection.vendor].format(table=table)
+        with CaptureQueriesContext(connection) as captured:
+            result = func(*args, **kwargs)
+
+        checked = 0
+        for query in captured.captured_queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or f'"{table}"' not in sql:
+                continue
+            plan = explain(sql)
+            checked += 1
+            self.assertIsNone(
+                re.search(pattern, plan),
+                f"Sequential scan on {table}:\n{sql}\n{plan}"
+            )
+        self.assertGreater(checked, 0, f"No queries against {table} were issued")
+        return result
+
+
+class RepeatedQueryAssertionsMixin:
+    # Runs a callable and fails if it issued the same SELECT shape
+    # `threshold` or more times, i.e. loaded something once per row.
+
+    def assertNoRepeatedQueries(self, func, *args, threshold=3, **kwargs):
+        with CaptureQueriesContext(connection) as captured:
+            result = func(*args, **kwargs)
+
+        repeated = repeated_queries([query['sql'] for query in captured.captured_queries], threshold)
+        self.assertFalse(
+            repeated,
+            "Repeated queries:\n" + "\n".join(f"{count}x {shape}" for shape, count in repeated.items())
+        )
+        return result
+
+
+class BookingStatsAssertionsMixin:
+    # Compares the incrementally maintained DailyBookingStats rollup with
+    # a rebuild from the bookings themselves.
+
+    def stats(self):
+        return {
+            (row.date, row.table_id, row.status, row.hour): (row.booking_count, row.guest_count)
+            for row in DailyBookingStats.objects.all()
+            if row.booking_count
+        }
+
+    def assertStatsConsistent(self):
+        incremental = self.stats()
+        rebuild_booking_stats()
+        self.assertEqual(self.stats(), incremental)
@@ -2,6 +2,7 @@ from django.urls import path
 from django.contrib.auth import views as auth_views
 from django.contrib import admin
 
+from . import api
 from . import views_admin
 from . import views
 
@@ -13,10 +14,18 @@ urlpatterns = [
     path('booking/<int:booking_id>/edit/', views.booking_edit, name='booking_edit'),
     path('booking/<int:booking_id>/cancel/', views.booking_cancel, name='booking_cancel'),
     path('mybookings/', views.booking_list, name='booking_list'),
+    path('waitlist/', views.waitlist_join, name='waitlist_join'),
+    path('waitlist/<int:entry_id>/leave/', views.waitlist_leave, name='waitlist_leave'),
     path('login/', views.custom_login, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('register/', views.register, name='register'),
 
+    # Booking API
+    path('api/availability/', api.availability, name='api_availability'),
+    path('api/availability/grid/', api.availability_grid, name='api_availability_grid'),
+    path('api/bookings/', api.booking_create, name='api_booking_create'),
+    path('api/bookings/<int:booking_id>/cancel/', api.booking_cancel, name='api_booking_cancel'),
+
 
     # Admin URLs
     # path('admin/', admin.site.urls),
@@ -24,8 +33,10 @@ urlpatterns = [
     
     # Admin Booking URLs
     path('admin-bookings/', views_admin.admin_bookings, name='admin_bookings'),
+    path('admin-bookings/bulk/', views_admin.admin_bookings_bulk, name='admin_bookings_bulk'),
     path('admin-booking/<int:booking_id>/', views_admin.admin_booking_detail, name='admin_booking_detail'),
     path('admin-booking-add/', views_admin.admin_booking_add, name='admin_booking_add'),
+    path('admin-booking-series/', views_admin.admin_booking_series, name='admin_booking_series'),
     path('admin-booking/<int:booking_id>/edit/', views_admin.admin_booking_edit, name='admin_booking_edit'),
     path('admin-booking/<int:booking_id>/confirm/', views_admin.admin_booking_confirm, name='admin_booking_confirm'),
     path('admin-booking/<int:booking_id>/cancel/', views_admin.admin_booking_cancel, name='admin_booking_cancel'),
@@ -51,9 +62,18 @@ urlpatterns = [
     path('admin-customers/', views_admin.admin_customers, name='admin_customers'),
     path('admin-customer/<int:user_id>/', views_admin.admin_customer_detail, name='admin_customer_detail'),
     
+    # Admin Waitlist
+    path('admin-waitlist/', views_admin.admin_waitlist, name='admin_waitlist'),
+    
     # Admin Reports
     path('admin-reports/', views_admin.admin_reports, name='admin_reports'),
     
+    # Admin Import
+    path('admin-import/', views_admin.admin_import, name='admin_import'),
+    
     # Admin Settings
     path('admin-settings/', views_admin.admin_settings, name='admin_settings'),
+
+    # Admin Metrics (Prometheus text format)
+    path('admin-metrics/', views_admin.admin_metrics, name='admin_metrics'),
 ]
\ No newline at end of file
@@ -1,14 +1,22 @@
 from pyexpat.errors import messages
 from django.forms import ValidationError
 from django.shortcuts import redirect, render, get_object_or_404
-from .models import Table, Menu, Booking
+from .models import Table, Menu, Booking, WaitlistEntry
 from django.http import HttpResponse
-from .forms import BookingForm, UserRegistrationForm
+from .forms import BookingForm, UserRegistrationForm, WaitlistForm
+from .services import save_booking
+from .allocation import candidate_tables
+from .availability import AvailabilityGrid
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.contrib.auth import logout, login, authenticate, get_user_model
 from django.contrib.auth.forms import AuthenticationForm
+from django.conf import settings
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from .menu_cache import menu_state, menu_etag, menu_last_modified
 
 def custom_login(request):
     if request.method == 'POST':
@@ -59,21 +67,27 @@ def logout_view(request):
     logout(request)
     return redirect('index')
 
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=menu_etag, last_modified_func=menu_last_modified)
 def menu_view(request):
+    # The queryset is only evaluated when the cached fragment has expired.
     menu_items = Menu.objects.filter(is_available=True).order_by('category')
-    return render(request, 'restaurant/menu.html', {'menu_items': menu_items})
+    return render(request, 'restaurant/menu.html', {
+        'menu_items': menu_items,
+        'menu_version': menu_state(request)['version'],
+        'menu_cache_timeout': settings.MENU_CACHE_TIMEOUT
+    })
 
 @login_required
 def booking_view(request):
     if request.method == 'POST':
-        form = BookingForm(request.POST)
+        form = BookingForm(request.POST, auto_assign=True)
         if form.is_valid():
             booking = form.save(commit=False)
             booking.user = request.user
             
             try:
-                booking.full_clean()
-                booking.save()
+                save_booking(booking, auto_assign=True)
                 messages.success(request, "Your booking has been successfully created!")
                 return redirect('booking_detail', booking_id=booking.id)
             except ValidationError as e:
@@ -81,20 +95,30 @@ def booking_view(request):
                     for error in errors:
                         form.add_error(field if field != '__all__' else None, error)
     else:
-        form = BookingForm()
+        form = BookingForm(auto_assign=True, initial={'date': request.GET.get('date')})
+    
+    data = request.POST if request.method == 'POST' else request.GET
+    try:
+        grid_date = parse_date(data.get('date') or '') or timezone.now().date()
+    except ValueError:
+        grid_date = timezone.now().date()
+    guests = data.get('number_of_guests') or data.get('guests') or ''
+    grid = AvailabilityGrid.for_date(grid_date, candidate_tables(int(guests) if guests.isdigit() else None))
     
-    tables = Table.objects.all()
-    return render(request, 'restaurant/booking_form.html', {'form': form, 'tables': tables})
+    return render(request, 'restaurant/booking_form.html', {'form': form, 'grid': grid})
 
 @login_required
 def booking_detail(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
+    booking = get_object_or_404(Booking.objects.select_related('table'), id=booking_id, user=request.user)
     return render(request, 'restaurant/booking_detail.html', {'booking': booking})
 
 @login_required
 def booking_list(request):
-    bookings = Booking.objects.filter(user=request.user).order_by('-date', '-time')
-    return render(request, 'restaurant/booking_list.html', {'bookings': bookings})
+    bookings = Booking.objects.filter(user=request.user).select_related('table').order_by('-date', '-time')
+    waitlist = WaitlistEntry.objects.filter(
+        user=request.user, status=WaitlistEntry.WAITING, date__gte=timezone.now().date()
+    ).order_by('date', 'time')
+    return render(request, 'restaurant/booking_list.html', {'bookings': bookings, 'waitlist': waitlist})
 
 @login_required
 def booking_edit(request, booking_id):
@@ -108,7 +132,7 @@ def booking_edit(request, booking_id):
         form = BookingForm(request.POST, instance=booking)
         if form.is_valid():
             try:
-                form.save()
+                save_booking(form.save(commit=False))
                 messages.success(request, "Your booking has been updated!")
                 return redirect('booking_detail', booking_id=booking.id)
             except ValidationError as e:
@@ -136,5 +160,33 @@ def booking_cancel(request, booking_id):
     
     return render(request, 'restaurant/booking_cancel.html', {'booking': booking})
 
+@login_required
+def waitlist_join(request):
+    if request.method == 'POST':
+        form = WaitlistForm(request.POST, user=request.user)
+        if form.is_valid():
+            entry = form.save(commit=False)
+            entry.user = request.user
+            entry.save()
+            messages.success(request, "You're on the waitlist. If a table frees up we'll book it for you automatically.")
+            return redirect('booking_list')
+    else:
+        form = WaitlistForm(user=request.user, initial={
+            'date': request.GET.get('date'),
+            'time': request.GET.get('time'),
+            'number_of_guests': request.GET.get('number_of_guests'),
+        })
+    
+    return render(request, 'restaurant/waitlist_form.html', {'form': form})
+
+@login_required
+@require_POST
+def waitlist_leave(request, entry_id):
+    entry = get_object_or_404(WaitlistEntry, id=entry_id, user=request.user, status=WaitlistEntry.WAITING)
+    entry.status = WaitlistEntry.CANCELLED
+    entry.save(update_fields=['status'])
+    messages.success(request, "You have left the waitlist.")
+    return redirect('booking_list')
+
 def booking_confirmation_view(request):
     return HttpResponse("Booking Confirmed!")
@@ -1,16 +1,35 @@
 from functools import wraps
-from django.http import HttpResponseForbidden
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.contrib import messages
-from django.db.models import Count, Q, Avg
+from django.forms import ValidationError
+from django.db.models import Count, Q, Max, Sum, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from django.urls import reverse
+from django.views.decorators.http import require_POST
 from datetime import timedelta, datetime
+from urllib.parse import urlencode
+import calendar
 
 from django.conf import settings
-from .models import Booking, Table, Menu, CustomUser
-from .forms import TableForm, MenuForm, BookingForm
+from .models import Booking, BookingArchive, Table, Menu, CustomUser, WaitlistEntry
+from .forms import TableForm, MenuForm, BookingForm, BookingSeriesForm, ImportForm
+from .analytics import (
+    daily_booking_counts, daily_signup_counts, booking_summary, hourly_booking_counts,
+    customer_stats, favorite_table, archived_bookings_count
+)
+from .services import save_booking, bulk_set_status, bulk_delete
+from .recurring import create_series
+from .archive import recent_customer_bookings
+from .pagination import keyset_paginate
+from .metrics import registry
+from .importer import IMPORTERS, detect_format, read_rows
+from .export import (
+    EXPORT_FORMATS, BOOKING_EXPORT_HEADER, CUSTOMER_EXPORT_HEADER,
+    export_response, booking_export_rows, customer_export_rows
+)
 
 def admin_required(view_func):
     @wraps(view_func)
@@ -28,7 +47,7 @@ def admin_required(view_func):
 def admin_dashboard(request):
     today = timezone.now().date()
     
-    todays_bookings = Booking.objects.filter(date=today).order_by('time')
+    todays_bookings = Booking.objects.filter(date=today).select_related('user', 'table').order_by('time')
     
     today_bookings = todays_bookings.count()
     total_guests_today = sum(booking.number_of_guests for booking in todays_bookings)
@@ -47,30 +66,17 @@ def admin_dashboard(request):
     new_customers_percent = min(int(new_customers_this_month / max_new_customers * 100), 100)
     
     popular_tables = Table.objects.annotate(
-        booking_count=Count('booking')
+        booking_count=Coalesce(Sum('daily_stats__booking_count'), 0)
     ).order_by('-booking_count')[:5]
     
-    week_dates = []
-    week_data = []
-    week_labels = []
+    month_counts = daily_booking_counts(today - timedelta(days=29), today)
+    week_counts = month_counts[-7:]
     
-    for i in range(7):
-        date = today - timedelta(days=6-i)
-        week_dates.append(date)
-        count = Booking.objects.filter(date=date).count()
-        week_data.append(count)
-        week_labels.append(date.strftime('%a'))
+    week_data = [count for date, count in week_counts]
+    week_labels = [date.strftime('%a') for date, count in week_counts]
     
-    month_dates = []
-    month_data = []
-    month_labels = []
-    
-    for i in range(30):
-        date = today - timedelta(days=29-i)
-        month_dates.append(date)
-        count = Booking.objects.filter(date=date).count()
-        month_data.append(count)
-        month_labels.append(date.strftime('%d %b'))
+    month_data = [count for date, count in month_counts]
+    month_labels = [date.strftime('%d %b') for date, count in month_counts]
     
     recent_activities = [
         {
@@ -130,7 +136,7 @@ def admin_bookings(request):
     date_filter = request.GET.get('date')
     status_filter = request.GET.get('status')
     
-    bookings = Booking.objects.all().order_by('-date', '-time')
+    bookings = Booking.objects.select_related('user', 'table').order_by('-date', '-time')
     
     if date_filter:
         try:
@@ -142,9 +148,17 @@ def admin_bookings(request):
     if status_filter:
         bookings = bookings.filter(status=status_filter)
     
-    paginator = Paginator(bookings, 10)
-    page_number = request.GET.get('page')
-    bookings_page = paginator.get_page(page_number)
+    export_format = request.GET.get('export')
+    if export_format in EXPORT_FORMATS:
+        return export_response(export_format, f"bookings-{today}", BOOKING_EXPORT_HEADER, booking_export_rows(bookings), 'Bookings')
+    
+    bookings_page = keyset_paginate(
+        bookings, ('-date', '-time', '-id'), 10,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        last=request.GET.get('last') == '1',
+        estimate=settings.ADMIN_ESTIMATED_COUNTS
+    )
     
     context = {
         'bookings': bookings_page,
@@ -160,20 +174,12 @@ def admin_bookings(request):
 @login_required
 @admin_required
 def admin_booking_detail(request, booking_id):
-    booking = get_object_or_404(Booking, id=booking_id)
+    booking = get_object_or_404(Booking.objects.select_related('user', 'table'), id=booking_id)
     today = timezone.now().date()
     
-    other_bookings = Booking.objects.filter(user=booking.user).exclude(id=booking.id).order_by('-date')[:5]
+    other_bookings = Booking.objects.filter(user=booking.user).exclude(id=booking.id).select_related('table').order_by('-date')[:5]
     
-    customer_booking_count = Booking.objects.filter(user=booking.user).count()
-    customer_visits = Booking.objects.filter(user=booking.user, date__lt=today).count()
-    
-    user_bookings = Booking.objects.filter(user=booking.user)
-    if user_bookings.exists():
-        total_guests = sum(b.number_of_guests for b in user_bookings)
-        avg_party_size = round(total_guests / user_bookings.count(), 1)
-    else:
-        avg_party_size = 0
+    stats = customer_stats(booking.user_id, today)
     
     notes_history = []
     
@@ -181,9 +187,9 @@ def admin_booking_detail(request, booking_id):
         'booking': booking,
         'today': today,
         'other_bookings': other_bookings,
-        'customer_booking_count': customer_booking_count,
-        'customer_visits': customer_visits,
-        'avg_party_size': avg_party_size,
+        'customer_booking_count': stats['bookings_count'],
+        'customer_visits': stats['visits'],
+        'avg_party_size': round(stats['avg_party_size'], 1),
         'notes_history': notes_history
     }
     
@@ -203,11 +209,15 @@ def admin_booking_add(request):
                 try:
                     user = CustomUser.objects.get(id=user_id)
                     booking.user = user
-                    booking.save()
+                    save_booking(booking)
                     messages.success(request, "Booking created successfully")
                     return redirect('admin_booking_detail', booking_id=booking.id)
                 except CustomUser.DoesNotExist:
                     form.add_error(None, "Selected user does not exist")
+                except ValidationError as e:
+                    for field, errors in e.message_dict.items():
+                        for error in errors:
+                            form.add_error(field if field != '__all__' else None, error)
             else:
                 form.add_error(None, "Please select a user for this booking")
     else:
@@ -230,6 +240,44 @@ def admin_booking_add(request):
     return render(request, 'admin/booking_form.html', context)
 
 
+# Recurring and Block Bookings
+@login_required
+@admin_required
+def admin_booking_series(request):
+    conflicts = []
+    
+    if request.method == 'POST':
+        form = BookingSeriesForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            created, conflicts = create_series(
+                data['user'],
+                list(data['tables']),
+                data['dates'],
+                data['time'],
+                data['number_of_guests'],
+                duration=data['duration'],
+                special_requests=data['special_requests'],
+                status=data['status'],
+                skip_conflicts=data['skip_conflicts'],
+            )
+            if created:
+                messages.success(request, f"{len(created)} booking(s) created")
+                if conflicts:
+                    messages.warning(request, f"{len(conflicts)} conflicting occurrence(s) were skipped")
+                return redirect('admin_customer_detail', user_id=data['user'].id)
+            form.add_error(None, "No bookings were created because some occurrences conflict with existing bookings.")
+    else:
+        form = BookingSeriesForm(initial={'user': request.GET.get('user')})
+    
+    context = {
+        'form': form,
+        'conflicts': conflicts
+    }
+    
+    return render(request, 'admin/booking_series_form.html', context)
+
+
 # Edit Booking
 @login_required
 @admin_required
@@ -239,9 +287,14 @@ def admin_booking_edit(request, booking_id):
     if request.method == 'POST':
         form = BookingForm(request.POST, instance=booking)
         if form.is_valid():
-            form.save()
-            messages.success(request, "Booking updated successfully")
-            return redirect('admin_booking_detail', booking_id=booking.id)
+            try:
+                save_booking(form.save(commit=False))
+                messages.success(request, "Booking updated successfully")
+                return redirect('admin_booking_detail', booking_id=booking.id)
+            except ValidationError as e:
+                for field, errors in e.message_dict.items():
+                    for error in errors:
+                        form.add_error(field if field != '__all__' else None, error)
     else:
         form = BookingForm(instance=booking)
     
@@ -294,6 +347,56 @@ def admin_booking_delete(request, booking_id):
     
     return render(request, 'admin/booking_delete.html', context)
 
+# Bulk Booking Actions
+BULK_ACTION_STATUSES = {'confirm': 'CONFIRMED', 'cancel': 'CANCELLED'}
+
+@login_required
+@admin_required
+@require_POST
+def admin_bookings_bulk(request):
+    action = request.POST.get('action')
+    date_filter = request.POST.get('date')
+    status_filter = request.POST.get('status')
+    filters = {key: value for key, value in (('date', date_filter), ('status', status_filter)) if value}
+    back = redirect(f"{reverse('admin_bookings')}?{urlencode(filters)}" if filters else 'admin_bookings')
+    
+    if action not in ('confirm', 'cancel', 'delete'):
+        messages.error(request, "Please choose a bulk action")
+        return back
+    
+    if request.POST.get('scope') == 'filter':
+        # Never the whole table by accident: the filter has to narrow it.
+        if not filters:
+            messages.error(request, "Apply a date or status filter before acting on every matching booking")
+            return back
+        bookings = Booking.objects.all()
+        if date_filter:
+            try:
+                bookings = bookings.filter(date=datetime.strptime(date_filter, '%Y-%m-%d').date())
+            except ValueError:
+                messages.error(request, "Invalid date format")
+                return back
+        if status_filter:
+            bookings = bookings.filter(status=status_filter)
+    else:
+        selected = [value for value in request.POST.getlist('selected') if value.isdigit()]
+        if not selected:
+            messages.error(request, "Please select at least one booking")
+            return back
+        bookings = Booking.objects.filter(id__in=selected)
+    
+    if action == 'delete':
+        deleted = bulk_delete(bookings)
+        messages.success(request, f"{deleted} booking(s) deleted")
+        return back
+    
+    changed, conflicts = bulk_set_status(bookings, BULK_ACTION_STATUSES[action])
+    messages.success(request, f"{len(changed)} booking(s) {BULK_ACTION_STATUSES[action].lower()}")
+    if conflicts:
+        ids = ', '.join(f"#{row['pk']}" for row in conflicts)
+        messages.warning(request, f"Not confirmed because their table is taken or too small: {ids}")
+    return back
+
 # Table Management
 @login_required
 @admin_required
@@ -465,14 +568,13 @@ def admin_table_detail(request, table_id):
     upcoming_bookings = Booking.objects.filter(
         table=table,
         date__gte=today
-    ).order_by('date', 'time')[:10]
+    ).select_related('user').order_by('date', 'time')[:10]
     
-    total_bookings = Booking.objects.filter(table=table).count()
-    bookings_this_month = Booking.objects.filter(
-        table=table,
-        date__month=today.month, 
-        date__year=today.year
-    ).count()
+    first_day_of_month = today.replace(day=1)
+    last_day_of_month = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    
+    total_bookings = booking_summary(table=table)['total_bookings']
+    bookings_this_month = booking_summary(first_day_of_month, last_day_of_month, table=table)['total_bookings']
     
     days_in_month = 30  
     bookings_per_day = 8
@@ -563,13 +665,20 @@ def admin_customers(request):
     else:
         customers = CustomUser.objects.all().order_by('username')
     
-    paginator = Paginator(customers, 20)  
-    page_number = request.GET.get('page')
-    customers_page = paginator.get_page(page_number)
+    latest_booking = Booking.objects.filter(user=OuterRef('pk')).order_by('-date', '-time')
+    customers = customers.annotate(
+        bookings_count=Count('booking') + archived_bookings_count(),
+        last_booking_date=Max('booking__date'),
+        last_booking_id=Subquery(latest_booking.values('id')[:1])
+    )
     
-    for customer in customers_page:
-        customer.bookings_count = Booking.objects.filter(user=customer).count()
-        customer.last_booking = Booking.objects.filter(user=customer).order_by('-date').first()
+    customers_page = keyset_paginate(
+        customers, ('username', 'id'), 20,
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+        last=request.GET.get('last') == '1',
+        estimate=settings.ADMIN_ESTIMATED_COUNTS
+    )
     
     context = {
         'customers': customers_page,
@@ -581,42 +690,24 @@ def admin_customers(request):
 @login_required
 @admin_required
 def admin_customer_detail(request, user_id):
+    today = timezone.now().date()
     customer = get_object_or_404(CustomUser, id=user_id)
-    
-    bookings = Booking.objects.filter(user=customer).order_by('-date')
-    
-    bookings_count = bookings.count()
-    upcoming_bookings = bookings.filter(date__gte=timezone.now().date()).count()
-    completed_bookings = bookings.filter(date__lt=timezone.now().date()).count()
-    cancelled_bookings = bookings.filter(status='CANCELLED').count()
-    
-    if bookings.exists():
-        from django.db.models import Count
-        favorite_table = Table.objects.filter(
-            booking__user=customer
-        ).annotate(
-            count=Count('id')
-        ).order_by('-count').first()
-    else:
-        favorite_table = None
-    
-    if bookings.exists():
-        avg_party_size = bookings.aggregate(avg=Avg('number_of_guests'))['avg']
-        avg_party_size = round(avg_party_size, 1)
-    else:
-        avg_party_size = 0
+    stats = customer_stats(customer.id, today)
     
     context = {
         'customer': customer,
-        'bookings': bookings[:10],
-        'bookings_count': bookings_count,
-        'upcoming_bookings': upcoming_bookings,
-        'completed_bookings': completed_bookings,
-        'cancelled_bookings': cancelled_bookings,
-        'favorite_table': favorite_table,
-        'avg_party_size': avg_party_size,
+        'bookings': recent_customer_bookings(customer.id),
+        'bookings_count': stats['bookings_count'],
+        'upcoming_bookings': stats['upcoming_bookings'],
+        'completed_bookings': stats['completed_bookings'],
+        'cancelled_bookings': stats['cancelled_bookings'],
+        'favorite_table': favorite_table(customer.id),
+        'avg_party_size': round(stats['avg_party_size'], 1),
+        'total_guests': stats['total_guests'],
+        'visits': stats['visits'],
+        'last_visit': stats['last_visit'],
         'member_since': customer.date_joined,
-        'days_as_member': (timezone.now().date() - customer.date_joined.date()).days
+        'days_as_member': (today - customer.date_joined.date()).days
     }
     
     return render(request, 'admin/customer_detail.html', context)
@@ -652,40 +743,34 @@ def admin_reports(request):
     if period != 'custom':
         end_date = today
     
+    export_format = request.GET.get('export')
+    if export_format in EXPORT_FORMATS:
+        filename = f"{report_type}-report-{start_date}-{end_date}"
+        if report_type == 'customers':
+            customers = CustomUser.objects.filter(
+                date_joined__date__gte=start_date, date_joined__date__lte=end_date
+            ).order_by('date_joined', 'id')
+            return export_response(export_format, filename, CUSTOMER_EXPORT_HEADER, customer_export_rows(customers), 'Customers')
+        bookings = Booking.objects.filter(date__gte=start_date, date__lte=end_date).order_by('date', 'time', 'id')
+        archived = BookingArchive.objects.filter(date__gte=start_date, date__lte=end_date).order_by('date', 'time', 'id')
+        return export_response(export_format, filename, BOOKING_EXPORT_HEADER, booking_export_rows(archived, bookings), 'Bookings')
+    
     if report_type == 'bookings':
-        bookings_by_date = {}
-        
-        date_range = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_range.append(current_date)
-            bookings_by_date[current_date] = 0
-            current_date += timedelta(days=1)
-        
-        bookings = Booking.objects.filter(date__gte=start_date, date__lte=end_date)
-        for booking in bookings:
-            if booking.date in bookings_by_date:
-                bookings_by_date[booking.date] += 1
+        counts_by_day = daily_booking_counts(start_date, end_date)
+        date_range = [date for date, count in counts_by_day]
         
         labels = [date.strftime(date_format) for date in date_range]
-        data = [bookings_by_date[date] for date in date_range]
+        data = [count for date, count in counts_by_day]
         
-        total_bookings = bookings.count()
+        summary = booking_summary(start_date, end_date)
+        total_bookings = summary['total_bookings']
         avg_bookings_per_day = total_bookings / len(date_range) if date_range else 0
-        total_guests = sum(booking.number_of_guests for booking in bookings)
+        total_guests = summary['total_guests']
         avg_guests_per_booking = total_guests / total_bookings if total_bookings else 0
         
-        status_counts = {
-            'PENDING': bookings.filter(status='PENDING').count(),
-            'CONFIRMED': bookings.filter(status='CONFIRMED').count(),
-            'CANCELLED': bookings.filter(status='CANCELLED').count()
-        }
-        
-        popular_hours = {}
-        for booking in bookings:
-            hour = booking.time.hour
-            popular_hours[hour] = popular_hours.get(hour, 0) + 1
+        status_counts = summary['status_counts']
         
+        popular_hours = hourly_booking_counts(start_date, end_date)
         popular_hours = dict(sorted(popular_hours.items(), key=lambda x: x[1], reverse=True)[:5])
         
         popular_hours_display = {}
@@ -713,33 +798,20 @@ def admin_reports(request):
         }
     
     elif report_type == 'customers':
-        new_customers_by_date = {}
+        counts_by_day = daily_signup_counts(start_date, end_date)
         
-        date_range = []
-        current_date = start_date
-        while current_date <= end_date:
-            date_range.append(current_date)
-            new_customers_by_date[current_date] = 0
-            current_date += timedelta(days=1)
-        
-        customers = CustomUser.objects.filter(date_joined__date__gte=start_date, date_joined__date__lte=end_date)
-        for customer in customers:
-            join_date = customer.date_joined.date()
-            if join_date in new_customers_by_date:
-                new_customers_by_date[join_date] += 1
-        
-        labels = [date.strftime(date_format) for date in date_range]
-        data = [new_customers_by_date[date] for date in date_range]
+        labels = [date.strftime(date_format) for date, count in counts_by_day]
+        data = [count for date, count in counts_by_day]
         
         total_customers = CustomUser.objects.count()
-        new_customers = customers.count()
+        new_customers = sum(data)
         
         active_customers = CustomUser.objects.filter(
             booking__date__gte=today - timedelta(days=30)
         ).distinct().count()
         
         top_customers = CustomUser.objects.annotate(
-            booking_count=Count('booking')
+            booking_count=Count('booking') + archived_bookings_count()
         ).order_by('-booking_count')[:10]
         
         context = {
@@ -758,6 +830,57 @@ def admin_reports(request):
     
     return render(request, 'admin/reports.html', context)
 
+# Import View
+@login_required
+@admin_required
+def admin_import(request):
+    importer = None
+    
+    if request.method == 'POST':
+        form = ImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            format = form.cleaned_data['format'] or detect_format(upload.name)
+            importer = IMPORTERS[form.cleaned_data['kind']](max_errors=100)
+            importer.run(read_rows(upload.file, format))
+            messages.success(
+                request,
+                f"Imported {importer.created} of {importer.rows} rows in {importer.elapsed:.1f}s"
+            )
+    else:
+        form = ImportForm()
+    
+    context = {
+        'form': form,
+        'importer': importer
+    }
+    
+    return render(request, 'admin/import.html', context)
+
+# Waitlist
+@login_required
+@admin_required
+def admin_waitlist(request):
+    waitlist_date = request.GET.get('date', '')
+    status_filter = request.GET.get('status', WaitlistEntry.WAITING)
+    try:
+        filter_date = datetime.strptime(waitlist_date, '%Y-%m-%d').date()
+    except ValueError:
+        filter_date = timezone.now().date()
+    
+    entries = WaitlistEntry.objects.filter(date=filter_date).select_related('user', 'booking__table').order_by('time', 'created_at')
+    if status_filter:
+        entries = entries.filter(status=status_filter)
+    
+    context = {
+        'entries': entries,
+        'filter_date': filter_date,
+        'status_filter': status_filter,
+        'status_choices': WaitlistEntry.STATUS_CHOICES,
+    }
+    
+    return render(request, 'admin/waitlist.html', context)
+
 # Settings View
 @login_required
 @admin_required
@@ -790,4 +913,10 @@ def admin_settings(request):
         'db_stats': db_stats
     }
     
-    return render(request, 'admin/settings.html', context)
\ No newline at end of file
+    return render(request, 'admin/settings.html', context)
+
+# Request Metrics
+@login_required
+@admin_required
+def admin_metrics(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,72 @@
+from datetime import date, datetime, time, timedelta
+
+from django.db import transaction
+
+from .availability import DaySchedule
+from .models import Booking, Table, WaitlistEntry
+
+# Waiting parties considered per freed slot. They are the best-fitting
+# ones, so a full day's waitlist is never read into memory.
+PROMOTION_CANDIDATES = 20
+
+
+def promotion_window(start_time, duration):
+    # Start times whose default-length seating overlaps the freed
+    # interval [start, start + duration) - the only waiting parties a
+    # cancellation can make room for.
+    start = datetime.combine(date(2000, 1, 1), start_time)
+    earliest = start - timedelta(minutes=Booking.DEFAULT_DURATION)
+    latest = start + timedelta(minutes=duration)
+    return (
+        earliest.time() if earliest.date() == start.date() else time.min,
+        latest.time() if latest.date() == start.date() else time.max,
+    )
+
+
+def waiting_candidates(day, start_time, duration, capacity):
+    earliest, latest = promotion_window(start_time, duration)
+    return WaitlistEntry.objects.filter(
+        status=WaitlistEntry.WAITING,
+        date=day,
+        time__gt=earliest,
+        time__lt=latest,
+        number_of_guests__lte=capacity,
+    ).order_by('-number_of_guests', 'created_at', 'id')
+
+
+def promote_waitlist(table_id, date, start_time, duration):
+    # Fills a freed slot on `table_id` from the waitlist: the largest
+    # waiting parties the table seats come first, then the longest
+    # waiting, and each one whose own time is free on the table becomes a
+    # PENDING booking. Runs under the table's row lock, like save_booking,
+    # and skips entries another promotion has locked.
+    with transaction.atomic():
+        table = Table.objects.select_for_update().filter(pk=table_id).first()
+        if table is None:
+            return []
+        entries = list(
+            waiting_candidates(date, start_time, duration, table.capacity)
+            .select_for_update(skip_locked=True)[:PROMOTION_CANDIDATES]
+        )
+        if not entries:
+            return []
+
+        schedule = DaySchedule.for_date(date, tables=[table])
+        promoted = []
+        for entry in entries:
+            if not schedule.is_free(table.pk, entry.time):
+                continue
+            entry.booking = Booking.objects.create(
+                user_id=entry.user_id,
+                table=table,
+                date=entry.date,
+                time=entry.time,
+                number_of_guests=entry.number_of_guests,
+                special_requests=entry.special_requests,
+                status='PENDING',
+            )
+            entry.status = WaitlistEntry.PROMOTED
+            entry.save(update_fields=['booking', 'status'])
+            schedule.reserve(table.pk, entry.time)
+            promoted.append(entry)
+    return promoted
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'restaurant.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,13 +46,25 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'restaurant.middleware.RepeatedQueryMiddleware',
 ]
 
+# In DEBUG, warn when a request repeats the same query this many times.
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 5))
+
+# Per-view request metrics, served in Prometheus format at /admin-metrics/.
+# METRICS_PROFILE_RATE = N profiles one in N requests (to the views listed
+# in METRICS_PROFILE_VIEWS, or all views) with cProfile; 0 turns it off.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+METRICS_PROFILE_RATE = int(os.environ.get('METRICS_PROFILE_RATE', 0))
+METRICS_PROFILE_VIEWS = [view for view in os.environ.get('METRICS_PROFILE_VIEWS', '').split(',') if view]
+METRICS_PROFILE_DIR = os.environ.get('METRICS_PROFILE_DIR', str(BASE_DIR / 'profiles'))
+
 ROOT_URLCONF = 'restaurant_booking.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'restaurant.metrics.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'restaurant' / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -82,6 +95,104 @@ DATABASES = {
     }
 }
 
+# Connection management, selected with DB_CONN_MODE:
+#   none        - open and close a connection for every request (default)
+#   persistent  - keep connections for DB_CONN_MAX_AGE seconds, checking
+#                 them before reuse
+#   pool        - Django's native connection pool; requires psycopg 3
+#                 installed with the pool extra (psycopg[pool])
+DB_CONN_MODE = os.environ.get('DB_CONN_MODE', 'none')
+
+if DB_CONN_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_CONN_MODE == 'pool':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 600)),
+        }
+    }
+
+
+# Cache
+# locmem is per process; use the file or redis backend to share cached
+# sessions and users between workers.
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem')
+
+if CACHE_BACKEND == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', 'redis://127.0.0.1:6379'),
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / 'cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+MENU_CACHE_TIMEOUT = int(os.environ.get('MENU_CACHE_TIMEOUT', 300))
+
+# Sessions, selected with SESSION_MODE:
+#   db              - a session row read on every request (default)
+#   cached_db       - read from the cache, written through to the database;
+#                     needs a cache shared by all workers (redis or file)
+#   signed_cookies  - no server-side storage; the session lives in a
+#                     signed cookie, so it must stay small
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+
+if SESSION_MODE == 'cached_db':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+elif SESSION_MODE == 'signed_cookies':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+
+# Background tasks (emails, waitlist promotion). Tasks are stored with the
+# change that caused them and run after its commit on a thread pool in the
+# web process; `manage.py run_tasks` runs retries and anything the web
+# process didn't get to. Set TASKS_RUN_IN_PROCESS=0 to leave all of it to
+# the worker.
+TASKS_RUN_IN_PROCESS = os.environ.get('TASKS_RUN_IN_PROCESS', '1') == '1'
+TASK_THREADS = int(os.environ.get('TASK_THREADS', 4))
+TASK_RETRY_DELAY = int(os.environ.get('TASK_RETRY_DELAY', 30))
+TASK_TIMEOUT = int(os.environ.get('TASK_TIMEOUT', 600))
+# run_tasks deletes finished and failed tasks after this many days.
+TASK_RETENTION_DAYS = int(os.environ.get('TASK_RETENTION_DAYS', 7))
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'SpicyFood <bookings@spicyfood.example>')
+
+# Seconds the logged-in user is cached between requests (0 disables).
+# Saving a user only clears the entry in the cache it was saved through,
+# so with the per-process locmem cache other workers would keep a
+# deactivated user, a revoked role or an old password's session hash for
+# the whole timeout. The cache is therefore off unless it is shared.
+AUTHENTICATION_BACKENDS = ['restaurant.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60 if CACHE_BACKEND in ('redis', 'file') else 0))
+
+# Show an estimated total on the admin bookings and customers lists. It
+# costs one EXPLAIN per page (PostgreSQL only), so it is off by default.
+ADMIN_ESTIMATED_COUNTS = os.environ.get('ADMIN_ESTIMATED_COUNTS', '0') == '1'
+
+# Hours and slot size of the availability grid shown on the booking form.
+BOOKING_OPENING_TIME = os.environ.get('BOOKING_OPENING_TIME', '10:00')
+BOOKING_CLOSING_TIME = os.environ.get('BOOKING_CLOSING_TIME', '22:00')
+BOOKING_SLOT_MINUTES = int(os.environ.get('BOOKING_SLOT_MINUTES', 15))
+
+# archive_bookings moves bookings older than this many days to BookingArchive.
+BOOKING_ARCHIVE_DAYS = int(os.environ.get('BOOKING_ARCHIVE_DAYS', 365))
 
 
 # Password validation